@@ -0,0 +1,83 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import make_password, verify_password
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def hash_executor():
+    """Process-wide pool that runs password hashing, at most LOGIN_HASH_WORKERS at a time.
+
+    Argon2, scrypt and PBKDF2 release the GIL, so the pool spreads a login storm
+    over several cores while capping how many cores it can take from other requests.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.LOGIN_HASH_WORKERS,
+                                           thread_name_prefix='password-hash')
+        return _executor
+
+
+def _check(password, encoded):
+    # Returns (is_correct, new_hash); new_hash is set when the stored hash is outdated
+    is_correct, must_update = verify_password(password, encoded)
+    if is_correct and must_update:
+        return True, make_password(password)
+    return is_correct, None
+
+
+class PooledHashingBackend(ModelBackend):
+    """ModelBackend that hashes in ``hash_executor()`` instead of the calling thread.
+
+    Hashes made with an older hasher or weaker parameters are upgraded to the
+    first entry of PASSWORD_HASHERS on a successful login.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash anyway so unknown usernames take as long as wrong passwords
+            hash_executor().submit(make_password, password).result()
+            return None
+
+        is_correct, new_hash = hash_executor().submit(_check, password, user.password).result()
+        if new_hash:
+            user.password = new_hash
+            user.save(update_fields=['password'])
+        if is_correct and self.user_can_authenticate(user):
+            return user
+        return None
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        # Django's own aauthenticate() hashes on the event loop thread
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        loop = asyncio.get_running_loop()
+        try:
+            user = await UserModel._default_manager.aget_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            await loop.run_in_executor(hash_executor(), make_password, password)
+            return None
+
+        is_correct, new_hash = await loop.run_in_executor(hash_executor(), _check, password, user.password)
+        if new_hash:
+            user.password = new_hash
+            await user.asave(update_fields=['password'])
+        if is_correct and self.user_can_authenticate(user):
+            return user
+        return None
@@ -0,0 +1,82 @@
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from .models import Profile
+
+USER_FIELDS = ['username', 'email', 'first_name', 'last_name']
+PROFILE_FIELDS = ['phone', 'address']
+
+
+def clean_row(row):
+    """Normalise one CSV row, raising ValidationError for rows that cannot be imported."""
+    data = {field: (row.get(field) or '').strip() for field in USER_FIELDS + PROFILE_FIELDS}
+    if not data['username']:
+        raise ValidationError('username is required')
+    User.username_validator(data['username'])
+    for field in USER_FIELDS + PROFILE_FIELDS:
+        max_length = getattr((User if field in USER_FIELDS else Profile)._meta.get_field(field), 'max_length')
+        if max_length and len(data[field]) > max_length:
+            raise ValidationError(f'{field} is longer than {max_length} characters')
+    # Blank passwords become unusable; those users sign in after a password reset
+    data['password'] = row.get('password') or None
+    return data
+
+
+def hash_passwords(passwords, pool=None):
+    if pool is None:
+        return [make_password(password) for password in passwords]
+    return list(pool.map(make_password, passwords))
+
+
+def create_users(rows, pool=None):
+    """Create users and their profiles for cleaned rows; returns (created, conflicts).
+
+    Rows whose username already exists are skipped. Usernames another process
+    creates while the chunk is being hashed make the insert fail; those rows are
+    dropped, listed in ``conflicts`` and the rest of the chunk is inserted again.
+    """
+    existing = _taken([row['username'] for row in rows])
+    rows = [row for row in rows if row['username'] not in existing]
+    if not rows:
+        return 0, []
+
+    passwords = hash_passwords([row['password'] for row in rows], pool)
+    conflicts = []
+    while rows:
+        try:
+            _insert(rows, passwords)
+            return len(rows), conflicts
+        except IntegrityError:
+            taken = _taken([row['username'] for row in rows])
+            if not taken:
+                raise
+            conflicts += [row['username'] for row in rows if row['username'] in taken]
+            kept = [(row, password) for row, password in zip(rows, passwords) if row['username'] not in taken]
+            rows, passwords = [row for row, _ in kept], [password for _, password in kept]
+    return 0, conflicts
+
+
+def _taken(usernames):
+    return set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+
+
+def _insert(rows, passwords):
+    # bulk_create does not send post_save, so create_profile never runs and
+    # profiles are inserted here in the same transaction instead
+    users = [
+        User(password=password, **{field: row[field] for field in USER_FIELDS})
+        for row, password in zip(rows, passwords)
+    ]
+    with transaction.atomic():
+        User.objects.bulk_create(users)
+        if any(user.pk is None for user in users):
+            # Backends without INSERT ... RETURNING (MySQL) do not set primary keys
+            ids = dict(User.objects.filter(username__in=[user.username for user in users])
+                       .values_list('username', 'id'))
+            for user in users:
+                user.pk = ids[user.username]
+        Profile.objects.bulk_create([
+            Profile(user=user, **{field: row[field] for field in PROFILE_FIELDS})
+            for row, user in zip(rows, users)
+        ])
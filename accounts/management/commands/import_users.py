@@ -0,0 +1,77 @@
+import csv
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import django
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from accounts.imports import USER_FIELDS, PROFILE_FIELDS, clean_row, create_users
+
+
+class Command(BaseCommand):
+    help = 'Bulk-import users and profiles from CSV (username,email,first_name,last_name,password,phone,address)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV file with a header row, or '-' for stdin")
+        parser.add_argument('--batch-size', type=int, default=1000, help='Users inserted per transaction')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Password hashing processes (default: CPU count, 1 hashes inline)')
+
+    def handle(self, *args, **options):
+        path, batch_size = options['path'], options['batch_size']
+        source = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8-sig')
+        pool = None
+        if options['workers'] != 1:
+            # Workers only hash; django.setup() makes them work with the spawn start method too
+            pool = ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup)
+
+        started = time.monotonic()
+        created = skipped = invalid = 0
+        try:
+            reader = csv.DictReader(source)
+            missing = {'username'} - set(reader.fieldnames or [])
+            if missing:
+                raise CommandError(f"CSV header must include: {', '.join(sorted(missing))}")
+            unknown = set(reader.fieldnames) - set(USER_FIELDS + PROFILE_FIELDS + ['password'])
+            if unknown:
+                self.stderr.write(f"Ignoring columns: {', '.join(sorted(unknown))}")
+
+            batch, seen = [], set()
+            for line, row in enumerate(reader, start=2):
+                try:
+                    row = clean_row(row)
+                except ValidationError as exc:
+                    invalid += 1
+                    self.stderr.write(f"Line {line}: {'; '.join(exc.messages)}")
+                    continue
+                if row['username'] in seen:
+                    skipped += 1
+                    continue
+                seen.add(row['username'])
+                batch.append(row)
+                if len(batch) == batch_size:
+                    created, skipped = self.flush(batch, pool, created, skipped, started)
+                    batch = []
+            if batch:
+                created, skipped = self.flush(batch, pool, created, skipped, started)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            if source is not sys.stdin:
+                source.close()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {created} users in {elapsed:.1f}s ({created / elapsed if elapsed else 0:.1f}/s); '
+            f'{skipped} already existed, {invalid} invalid rows'
+        ))
+
+    def flush(self, batch, pool, created, skipped, started):
+        count, conflicts = create_users(batch, pool)
+        if conflicts:
+            self.stderr.write(f"Skipped usernames created by another process meanwhile: {', '.join(conflicts)}")
+        created += count
+        skipped += len(batch) - count
+        elapsed = time.monotonic() - started
+        self.stdout.write(f'Imported {created} users ({created / elapsed if elapsed else 0:.1f}/s)...')
+        return created, skipped
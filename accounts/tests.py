@@ -1,6 +1,20 @@
-from django.test import TestCase, Client
+import os
+import tempfile
+import threading
+from io import StringIO
+from unittest import mock
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import aauthenticate
+from django.contrib.auth.hashers import verify_password
 from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
 from django.urls import reverse
+from . import imports
 from .models import Profile
 
 
@@ -59,3 +73,127 @@ class AccountsTestCase(TestCase):
         self.user.profile.refresh_from_db()
         self.assertEqual(self.user.first_name, 'Updated')
         self.assertEqual(self.user.profile.phone, '1234567890')
+
+    @override_settings(RATELIMITS={'register': '1/h'})
+    def test_registration_rate_limit(self):
+        """Test that repeated registrations from one IP are throttled."""
+        caches['ratelimit'].clear()
+        data = {
+            'username': 'first',
+            'first_name': 'First',
+            'last_name': 'User',
+            'email': 'first@example.com',
+            'password1': 'complexpass123',
+            'password2': 'complexpass123'
+        }
+        self.assertEqual(self.client.post(reverse('accounts:register'), data).status_code, 302)
+        self.client.logout()
+        data['username'] = 'second'
+        self.assertEqual(self.client.post(reverse('accounts:register'), data).status_code, 429)
+        self.assertFalse(User.objects.filter(username='second').exists())
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+    def test_cached_sessions_skip_database(self):
+        """Test that cached_db sessions are read without querying the session table."""
+        self.client.login(username='testuser', password='testpass123')
+        self.client.get(reverse('accounts:profile'))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('accounts:profile'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query for query in queries if 'django_session' in query['sql']])
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+    def test_cached_session_logout(self):
+        """Test that logging out removes the cached session as well."""
+        self.client.login(username='testuser', password='testpass123')
+        session_key = self.client.session.session_key
+        self.client.post(reverse('accounts:logout'))
+
+        self.assertIsNone(caches[settings.SESSION_CACHE_ALIAS].get(f'django.contrib.sessions.cached_db{session_key}'))
+        self.assertFalse(Session.objects.filter(session_key=session_key).exists())
+
+    @override_settings(PASSWORD_HASHERS=[
+        'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.Argon2PasswordHasher',
+    ])
+    def test_password_rehashed_on_login(self):
+        """Test that logging in upgrades a hash made with an older hasher."""
+        self.user.set_password('testpass123')
+        self.user.save()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$'))
+
+        with override_settings(PASSWORD_HASHERS=[
+            'django.contrib.auth.hashers.Argon2PasswordHasher',
+            'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+        ]):
+            self.assertTrue(self.client.login(username='testuser', password='testpass123'))
+            self.user.refresh_from_db()
+            self.assertTrue(self.user.password.startswith('argon2$'))
+            self.assertTrue(self.client.login(username='testuser', password='testpass123'))
+
+    async def test_async_login_hashes_off_event_loop(self):
+        """Test that aauthenticate() verifies passwords in the hashing pool."""
+        threads = []
+
+        def recording_verify(password, encoded):
+            threads.append(threading.current_thread().name)
+            return verify_password(password, encoded)
+
+        with mock.patch('accounts.backends.verify_password', recording_verify):
+            user = await aauthenticate(username='testuser', password='testpass123')
+            self.assertEqual(user, self.user)
+            self.assertIsNone(await aauthenticate(username='testuser', password='wrong'))
+        self.assertEqual(len(threads), 2)
+        self.assertTrue(all(name.startswith('password-hash') for name in threads))
+
+
+class ImportUsersTestCase(TestCase):
+    def setUp(self):
+        User.objects.create_user(username='existing', password='testpass123')
+        self.csv = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False)
+        self.csv.write(
+            'username,email,first_name,last_name,password,phone,address\n'
+            'alice,alice@corp.example,Alice,Smith,alicepass123,5550001,1 Main St\n'
+            'bob,bob@corp.example,Bob,Jones,,5550002,\n'
+            'existing,other@corp.example,Ex,Isting,whatever,,\n'
+            ',nobody@corp.example,,,nopass,,\n'
+        )
+        self.csv.close()
+        self.addCleanup(os.remove, self.csv.name)
+
+    def test_import_creates_users_with_profiles(self):
+        """Test that imported users get hashed passwords and exactly one profile."""
+        out, err = StringIO(), StringIO()
+        call_command('import_users', self.csv.name, workers=2, batch_size=1, stdout=out, stderr=err)
+
+        alice = User.objects.get(username='alice')
+        self.assertTrue(alice.check_password('alicepass123'))
+        self.assertEqual(alice.profile.phone, '5550001')
+        self.assertFalse(User.objects.get(username='bob').has_usable_password())
+        self.assertEqual(Profile.objects.count(), User.objects.count())
+        self.assertIn('Imported 2 users', out.getvalue())
+        self.assertIn('Line 5: username is required', err.getvalue())
+
+    def test_import_skips_existing_users(self):
+        """Test that re-running an import leaves existing users untouched."""
+        call_command('import_users', self.csv.name, workers=1, stdout=StringIO(), stderr=StringIO())
+        call_command('import_users', self.csv.name, workers=1, stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(User.objects.filter(username='alice').count(), 1)
+        self.assertTrue(User.objects.get(username='existing').check_password('testpass123'))
+
+    def test_import_skips_usernames_created_concurrently(self):
+        """Test that a username taken after the existence check skips that row, not the chunk."""
+        hash_passwords = imports.hash_passwords
+
+        def hash_while_bob_registers(passwords, pool=None):
+            User.objects.create_user(username='bob', password='registered123')
+            return hash_passwords(passwords, pool)
+
+        err = StringIO()
+        with mock.patch.object(imports, 'hash_passwords', hash_while_bob_registers):
+            call_command('import_users', self.csv.name, workers=1, stdout=StringIO(), stderr=err)
+        self.assertIn('created by another process meanwhile: bob', err.getvalue())
+        self.assertEqual(User.objects.get(username='alice').profile.phone, '5550001')
+        self.assertTrue(User.objects.get(username='bob').check_password('registered123'))
+        self.assertEqual(Profile.objects.count(), User.objects.count())
@@ -3,6 +3,7 @@ from django.contrib.auth import login
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.contrib.auth.views import LoginView
+from travel_booking.ratelimit import ratelimit
 from .forms import RegisterForm, ProfileForm, UserForm
 
 
@@ -11,6 +12,7 @@ class CustomLoginView(LoginView):
     redirect_authenticated_user = True
 
 
+@ratelimit('register', methods=['POST'])
 def register(request):
     if request.method == 'POST':
         form = RegisterForm(request.POST)
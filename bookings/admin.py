@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import TravelOption, Booking
+from .models import (TravelOption, Booking, WaitlistEntry, Task, ArchivedTravelOption, ArchivedBooking,
+                     OutboxEvent, OutboxCheckpoint)
 
 
 @admin.register(TravelOption)
@@ -12,7 +13,50 @@ class TravelOptionAdmin(admin.ModelAdmin):
 
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
-    list_display = ['user', 'travel_option', 'number_of_seats', 'total_price', 'status', 'booking_date']
-    list_filter = ['status', 'travel_option__type']
-    search_fields = ['user__username', 'travel_option__source', 'travel_option__destination']
-    readonly_fields = ['total_price', 'booking_date']
\ No newline at end of file
+    list_display = ['user', 'travel_option', 'departure_time', 'number_of_seats', 'total_price', 'status', 'booking_date']
+    list_filter = ['status', 'travel_type']
+    search_fields = ['user__username', 'source', 'destination']
+    readonly_fields = ['total_price', 'booking_date']
+
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ['user', 'travel_option', 'number_of_seats', 'status', 'created_at', 'promoted_at']
+    list_filter = ['status']
+    search_fields = ['user__username', 'travel_option__travel_id']
+    readonly_fields = ['created_at', 'promoted_at', 'booking']
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ['name', 'status', 'attempts', 'run_at', 'created_at']
+    list_filter = ['status', 'name']
+    search_fields = ['idempotency_key']
+    readonly_fields = ['created_at', 'updated_at', 'last_error']
+
+
+@admin.register(ArchivedTravelOption)
+class ArchivedTravelOptionAdmin(admin.ModelAdmin):
+    list_display = ['travel_id', 'type', 'source', 'destination', 'date_time', 'archived_at']
+    list_filter = ['type']
+    search_fields = ['travel_id', 'source', 'destination']
+
+
+@admin.register(ArchivedBooking)
+class ArchivedBookingAdmin(admin.ModelAdmin):
+    list_display = ['booking_id', 'user', 'travel_option', 'number_of_seats', 'total_price', 'status', 'booking_date']
+    list_filter = ['status']
+    search_fields = ['booking_id', 'user__username']
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'event_type', 'booking', 'created_at']
+    list_filter = ['event_type']
+    search_fields = ['booking']
+    readonly_fields = ['event_type', 'booking', 'payload', 'created_at']
+
+
+@admin.register(OutboxCheckpoint)
+class OutboxCheckpointAdmin(admin.ModelAdmin):
+    list_display = ['consumer', 'last_event_id', 'updated_at']
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class BookingsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'bookings'
+
+    def ready(self):
+        import bookings.availability  # noqa
+        import bookings.search  # noqa
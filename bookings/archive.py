@@ -0,0 +1,41 @@
+from django.db import transaction
+from .models import TravelOption, Booking, ArchivedTravelOption, ArchivedBooking
+
+TRAVEL_FIELDS = ['id', 'travel_id', 'type', 'source', 'destination', 'date_time',
+                 'price', 'available_seats', 'total_seats']
+BOOKING_FIELDS = ['id', 'booking_id', 'user_id', 'travel_option_id', 'number_of_seats',
+                  'total_price', 'booking_date', 'status', 'departure_time', 'travel_type',
+                  'source', 'destination']
+
+
+def archive_chunk(before, chunk_size):
+    """Move up to ``chunk_size`` departures older than ``before`` (and their bookings)
+    into the archive tables in one short transaction.
+
+    Returns (options, bookings) moved; (0, 0) once nothing is left.
+    """
+    with transaction.atomic():
+        ids = list(
+            TravelOption.objects.select_for_update()
+            .filter(date_time__lt=before)
+            .order_by('date_time')
+            .values_list('id', flat=True)[:chunk_size]
+        )
+        if not ids:
+            return 0, 0
+
+        options = TravelOption.objects.filter(id__in=ids).values(*TRAVEL_FIELDS)
+        ArchivedTravelOption.objects.bulk_create(
+            [ArchivedTravelOption(**row) for row in options],
+            ignore_conflicts=True
+        )
+        bookings = Booking.objects.filter(travel_option_id__in=ids).values(*BOOKING_FIELDS)
+        archived = ArchivedBooking.objects.bulk_create(
+            [ArchivedBooking(**row) for row in bookings],
+            batch_size=1000,
+            ignore_conflicts=True
+        )
+
+        Booking.objects.filter(travel_option_id__in=ids).delete()
+        TravelOption.objects.filter(id__in=ids).delete()
+    return len(ids), len(archived)
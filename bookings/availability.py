@@ -0,0 +1,284 @@
+import heapq
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta, time as dt_time, timezone as dt_timezone
+from decimal import Decimal
+from itertools import islice
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import TravelOption
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+ONE_MICROSECOND = timedelta(microseconds=1)
+# Rows committed late can carry an updated_at older than the newest one already
+# seen, so each poll re-reads this far behind the watermark
+POLL_LOOKBACK = timedelta(seconds=30)
+COLUMNS = ['id', 'travel_id', 'type', 'source', 'destination', 'date_time', 'price',
+           'available_seats', 'total_seats', 'updated_at']
+
+
+def to_micros(value):
+    return (value - EPOCH) // ONE_MICROSECOND
+
+
+def from_micros(value):
+    return EPOCH + timedelta(microseconds=value)
+
+
+def route_key(row):
+    return row['source'], row['destination'], row['type']
+
+
+class Route:
+    """Upcoming departures of one source/destination/type, sorted by departure time.
+
+    Each column is a separate typed array. Routes are never modified in place:
+    a change builds a new Route, so readers can use one without locking.
+    """
+    __slots__ = ['source', 'destination', 'type', 'search_key', 'times', 'updated', 'prices', 'seats',
+                 'total_seats', 'ids', 'travel_ids']
+
+    def __init__(self, source, destination, type, rows):
+        rows = sorted(rows, key=lambda row: (row['date_time'], str(row['id'])))
+        self.source = source
+        self.destination = destination
+        self.type = type
+        self.search_key = (source.casefold(), destination.casefold())
+        self.times = array('q', (to_micros(row['date_time']) for row in rows))
+        self.updated = array('q', (to_micros(row['updated_at']) for row in rows))
+        self.prices = array('q', (int(row['price'] * 100) for row in rows))
+        self.seats = array('l', (row['available_seats'] for row in rows))
+        self.total_seats = array('l', (row['total_seats'] for row in rows))
+        self.ids = [row['id'] for row in rows]
+        self.travel_ids = [row['travel_id'] for row in rows]
+
+    def rows(self):
+        for i in range(len(self.ids)):
+            yield self.row(i)
+
+    def row(self, i):
+        return {
+            'id': self.ids[i],
+            'travel_id': self.travel_ids[i],
+            'type': self.type,
+            'source': self.source,
+            'destination': self.destination,
+            'date_time': from_micros(self.times[i]),
+            'price': Decimal(self.prices[i]).scaleb(-2),
+            'available_seats': self.seats[i],
+            'total_seats': self.total_seats[i],
+            'updated_at': from_micros(self.updated[i]),
+        }
+
+    def option(self, i):
+        # An unsaved instance is all the listing template needs
+        return TravelOption(**self.row(i))
+
+
+def _departures(route, first, last):
+    # Ties on time are broken the same way in every process
+    for i in range(first, last):
+        yield route.times[i], route.source, route.destination, route.type, i, route
+
+
+class Departures:
+    """Search matches as (route, first, last) ranges, merged by departure time on demand.
+
+    Only the sliced page is merged and turned into model instances.
+    """
+
+    def __init__(self, ranges):
+        self.ranges = ranges
+        self.count = sum(last - first for _, first, last in ranges)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        merged = heapq.merge(*(_departures(*match) for match in self.ranges))
+        return [match[-1].option(match[-2]) for match in islice(merged, index.start, index.stop)]
+
+
+class AvailabilityIndex:
+    """Per-process copy of upcoming inventory, grouped by route.
+
+    The index is loaded on first use, re-reads rows whose ``updated_at`` moved
+    every ``AVAILABILITY_INDEX_POLL_SECONDS``, and is rebuilt from scratch every
+    ``AVAILABILITY_INDEX_RELOAD_SECONDS`` to drop deleted rows. Saves made by
+    this process are applied as soon as they commit.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self._routes = {}
+        # id -> (route key, updated_at) of every indexed departure
+        self._entries = {}
+        self._watermark = None
+        self._loaded_at = self._polled_at = None
+
+    def ensure_fresh(self):
+        now = time.monotonic()
+        if self._loaded_at is None:
+            with self._lock:
+                if self._loaded_at is None:
+                    self._reload()
+            return
+        stale = now - self._loaded_at >= settings.AVAILABILITY_INDEX_RELOAD_SECONDS
+        if not stale and now - self._polled_at < settings.AVAILABILITY_INDEX_POLL_SECONDS:
+            return
+        # One thread refreshes; the others keep serving the current routes
+        if self._lock.acquire(blocking=False):
+            try:
+                if stale:
+                    self._reload()
+                else:
+                    self._poll()
+            finally:
+                self._lock.release()
+
+    def _reload(self):
+        rows = TravelOption.objects.filter(date_time__gt=timezone.now()).values(*COLUMNS)
+        grouped = {}
+        watermark = None
+        for row in rows.iterator(chunk_size=2000):
+            grouped.setdefault(route_key(row), []).append(row)
+            watermark = row['updated_at'] if watermark is None else max(watermark, row['updated_at'])
+        self._routes = {key: Route(*key, route_rows) for key, route_rows in grouped.items()}
+        self._entries = {row['id']: (key, row['updated_at']) for key, route_rows in grouped.items()
+                         for row in route_rows}
+        self._watermark = watermark
+        self._loaded_at = self._polled_at = time.monotonic()
+
+    def _poll(self):
+        if self._watermark is None:
+            rows = TravelOption.objects.filter(date_time__gt=timezone.now())
+        else:
+            rows = TravelOption.objects.filter(updated_at__gte=self._watermark - POLL_LOOKBACK)
+        # The lookback window mostly returns rows the index already holds
+        changed = [row for row in rows.values(*COLUMNS)
+                   if self._entries.get(row['id']) != (route_key(row), row['updated_at'])]
+        self._apply(changed)
+        self._polled_at = time.monotonic()
+
+    def _apply(self, changed, removed=()):
+        """Upsert ``changed`` rows and drop ``removed`` ids; caller holds the lock."""
+        if not changed and not removed:
+            return
+        now = timezone.now()
+        drop = set(removed) | {row['id'] for row in changed}
+        affected = {self._entries[pk][0] for pk in drop if pk in self._entries}
+        upserts = {}
+        for row in changed:
+            if row['date_time'] > now:
+                upserts.setdefault(route_key(row), []).append(row)
+            if self._watermark is None or row['updated_at'] > self._watermark:
+                self._watermark = row['updated_at']
+        affected |= set(upserts)
+
+        routes = dict(self._routes)
+        for key in affected:
+            rows = [row for row in routes[key].rows() if row['id'] not in drop] if key in routes else []
+            rows += upserts.get(key, [])
+            if rows:
+                routes[key] = Route(*key, rows)
+            else:
+                routes.pop(key, None)
+        for pk in drop:
+            self._entries.pop(pk, None)
+        for key, rows in upserts.items():
+            for row in rows:
+                self._entries[row['id']] = (key, row['updated_at'])
+        # Swap in the new mapping in one step; searches hold on to the previous one
+        self._routes = routes
+
+    def update(self, travel):
+        """Apply one saved TravelOption (post_save after commit)."""
+        if self._loaded_at is None:
+            return
+        with self._lock:
+            self._apply([{column: getattr(travel, column) for column in COLUMNS}])
+
+    def remove(self, pk):
+        if self._loaded_at is None:
+            return
+        with self._lock:
+            self._apply([], removed=[pk])
+
+    def reconcile(self, travel):
+        """Make sure the entry for a row just read from the database matches it.
+
+        Returns False if the index was stale (and has now been corrected).
+        """
+        if self._loaded_at is None:
+            return True
+        key, _ = self._entries.get(travel.pk, (None, None))
+        route = self._routes.get(key) if key else None
+        if route is not None and travel.pk in route.ids:
+            row = route.row(route.ids.index(travel.pk))
+            if all(row[column] == getattr(travel, column)
+                   for column in ('date_time', 'price', 'available_seats', 'type', 'source', 'destination')):
+                return True
+        elif travel.date_time <= timezone.now():
+            return True
+        self.update(travel)
+        return False
+
+    def search(self, type='', source='', destination='', date=None):
+        """Departures after now matching the travel_list filters, in departure order.
+
+        Returns (Departures, stats), where stats has the same ``count``/``latest``
+        keys as the listing's database aggregate.
+        """
+        self.ensure_fresh()
+        routes = self._routes
+        source, destination = source.casefold(), destination.casefold()
+        start = to_micros(timezone.now()) + 1
+        end = None
+        if date:
+            day = timezone.make_aware(datetime.combine(date, dt_time.min))
+            start = max(start, to_micros(day))
+            end = to_micros(day + timedelta(days=1))
+
+        ranges = []
+        latest = None
+        for route in routes.values():
+            if (type and route.type != type or source not in route.search_key[0]
+                    or destination not in route.search_key[1]):
+                continue
+            first = bisect_left(route.times, start)
+            last = len(route.times) if end is None else bisect_left(route.times, end, first)
+            if first < last:
+                ranges.append((route, first, last))
+                newest = max(route.updated[first:last])
+                latest = newest if latest is None else max(latest, newest)
+        departures = Departures(ranges)
+        return departures, {
+            'latest': None if latest is None else from_micros(latest),
+            'count': len(departures),
+        }
+
+
+availability_index = AvailabilityIndex()
+
+
+@receiver(post_save, sender=TravelOption)
+def index_saved_travel_option(sender, instance, raw=False, **kwargs):
+    if settings.AVAILABILITY_INDEX and not raw:
+        transaction.on_commit(lambda: availability_index.update(instance))
+
+
+@receiver(post_delete, sender=TravelOption)
+def index_deleted_travel_option(sender, instance, **kwargs):
+    if settings.AVAILABILITY_INDEX:
+        pk = instance.pk
+        transaction.on_commit(lambda: availability_index.remove(pk))
@@ -0,0 +1,86 @@
+import csv
+import io
+import json
+from datetime import datetime, time, timedelta
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.text import compress_sequence
+from .models import Booking, ArchivedBooking
+
+# (column, lookup) pairs shared by live and archived bookings
+EXPORT_COLUMNS = [
+    ('booking_id', 'booking_id'),
+    ('id', 'id'),
+    ('status', 'status'),
+    ('booking_date', 'booking_date'),
+    ('number_of_seats', 'number_of_seats'),
+    ('total_price', 'total_price'),
+    ('username', 'user__username'),
+    ('email', 'user__email'),
+    ('travel_id', 'travel_option__travel_id'),
+    ('type', 'travel_option__type'),
+    ('source', 'travel_option__source'),
+    ('destination', 'travel_option__destination'),
+    ('departure', 'travel_option__date_time'),
+    ('price', 'travel_option__price'),
+]
+HEADER = [column for column, _ in EXPORT_COLUMNS] + ['archived']
+FORMATS = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+# Rows are written out in pieces of roughly this many characters
+PIECE_SIZE = 64 * 1024
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def export_rows(date_from=None, date_to=None, status=None, chunk_size=2000, using=None):
+    """Yield one tuple per booking, live bookings first, then archived ones.
+
+    Rows are fetched ``chunk_size`` at a time (server-side cursors on
+    PostgreSQL), so memory use does not grow with the number of bookings.
+    """
+    lookups = [lookup for _, lookup in EXPORT_COLUMNS]
+    for model in (Booking, ArchivedBooking):
+        bookings = model.objects.using(using).order_by('booking_date')
+        if date_from:
+            bookings = bookings.filter(booking_date__gte=_day_start(date_from))
+        if date_to:
+            bookings = bookings.filter(booking_date__lt=_day_start(date_to + timedelta(days=1)))
+        if status:
+            bookings = bookings.filter(status=status)
+        archived = model is ArchivedBooking
+        for row in bookings.values_list(*lookups).iterator(chunk_size=chunk_size):
+            yield (*row, archived)
+
+
+def _csv_pieces(rows):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(HEADER)
+    for row in rows:
+        writer.writerow(row)
+        if out.tell() >= PIECE_SIZE:
+            yield out.getvalue()
+            out.seek(0)
+            out.truncate()
+    yield out.getvalue()
+
+
+def _jsonl_pieces(rows):
+    lines, size = [], 0
+    for row in rows:
+        line = json.dumps(dict(zip(HEADER, row)), cls=DjangoJSONEncoder)
+        lines.append(line)
+        size += len(line) + 1
+        if size >= PIECE_SIZE:
+            yield '\n'.join(lines) + '\n'
+            lines, size = [], 0
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def export_stream(rows, fmt='csv', compress=False):
+    """Encode rows as CSV or JSON Lines bytes, optionally as one gzip stream."""
+    pieces = (piece.encode() for piece in (_csv_pieces if fmt == 'csv' else _jsonl_pieces)(rows))
+    return compress_sequence(pieces) if compress else pieces
@@ -1,8 +1,13 @@
+import uuid
 from django import forms
-from .models import Booking
+from .models import Booking, WaitlistEntry
+from .search import normalize_place
 
 
 class BookingForm(forms.ModelForm):
+    # Resubmitting the same token (double click, proxy retry) replays the first result
+    idempotency_key = forms.CharField(max_length=64, required=False, widget=forms.HiddenInput)
+
     class Meta:
         model = Booking
         fields = ['number_of_seats']
@@ -17,6 +22,8 @@ class BookingForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         self.travel_option = kwargs.pop('travel_option', None)
         super().__init__(*args, **kwargs)
+        if not self.is_bound:
+            self.initial.setdefault('idempotency_key', uuid.uuid4().hex)
         if self.travel_option:
             self.fields['number_of_seats'].widget.attrs['max'] = min(10, self.travel_option.available_seats)
             self.fields['number_of_seats'].help_text = f'Available seats: {self.travel_option.available_seats}'
@@ -28,10 +35,56 @@ class BookingForm(forms.ModelForm):
         return seats
 
 
+class WaitlistForm(forms.ModelForm):
+    class Meta:
+        model = WaitlistEntry
+        fields = ['number_of_seats']
+        widgets = {
+            'number_of_seats': forms.NumberInput(attrs={
+                'class': 'form-control',
+                'min': 1,
+                'max': 10
+            })
+        }
+
+    def clean_number_of_seats(self):
+        seats = self.cleaned_data['number_of_seats']
+        if not 1 <= seats <= 10:
+            raise forms.ValidationError('You can wait for between 1 and 10 seats.')
+        return seats
+
+
 class FilterForm(forms.Form):
     TYPE_CHOICES = [('', 'All Types')] + [('FLIGHT', 'Flight'), ('TRAIN', 'Train'), ('BUS', 'Bus')]
     
     type = forms.ChoiceField(choices=TYPE_CHOICES, required=False, widget=forms.Select(attrs={'class': 'form-control'}))
     source = forms.CharField(max_length=100, required=False, widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'From'}))
     destination = forms.CharField(max_length=100, required=False, widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'To'}))
-    date = forms.DateField(required=False, widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}))
\ No newline at end of file
+    date = forms.DateField(required=False, widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        # "NYC", "new york " and "New York" are one search (and one memo entry)
+        for field in ('source', 'destination'):
+            if cleaned_data.get(field):
+                cleaned_data[field] = normalize_place(cleaned_data[field])
+        return cleaned_data
+
+
+class ExportForm(forms.Form):
+    """Filters for the staff booking export (see ``bookings.exports``)."""
+    format = forms.ChoiceField(choices=[('csv', 'CSV'), ('jsonl', 'JSON Lines')], required=False)
+    date_from = forms.DateField(required=False)
+    date_to = forms.DateField(required=False)
+    status = forms.ChoiceField(choices=[('', 'Any')] + Booking.STATUS_CHOICES, required=False)
+    gzip = forms.BooleanField(required=False)
+
+    def clean_format(self):
+        return self.cleaned_data['format'] or 'csv'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from, date_to = cleaned_data.get('date_from'), cleaned_data.get('date_to')
+        if date_from and date_to and date_from > date_to:
+            raise forms.ValidationError('date_from must not be after date_to.')
+        return cleaned_data
@@ -0,0 +1,52 @@
+import heapq
+import uuid
+from datetime import datetime
+from django.db.models import Q
+from .models import ArchivedBooking, Booking
+
+# Cursors point at the last booking shown: "<booking_date isoformat>_<id>".
+# Pages are ordered newest first by (booking_date, id), which the
+# (user, booking_date) indexes on both booking tables serve. Rows carry their
+# departure and route (models.SUMMARY_FIELDS), so no page joins travel options.
+
+
+def encode_cursor(booking):
+    return f'{booking.booking_date.isoformat()}_{booking.pk}'
+
+
+def decode_cursor(cursor):
+    """Return (booking_date, id); raises ValueError for a malformed cursor."""
+    booking_date, _, pk = cursor.rpartition('_')
+    booking_date = datetime.fromisoformat(booking_date)
+    if booking_date.tzinfo is None:
+        raise ValueError('Cursor timestamp must carry a UTC offset')
+    return booking_date, uuid.UUID(pk)
+
+
+def _page(queryset, after, size):
+    if after is not None:
+        booking_date, pk = after
+        queryset = queryset.filter(Q(booking_date__lt=booking_date) | Q(booking_date=booking_date, pk__lt=pk))
+    return list(queryset.order_by('-booking_date', '-pk')[:size + 1])
+
+
+def _result(rows, size):
+    """Trim a size + 1 fetch to one page and the cursor for the next (None on the last page)."""
+    if len(rows) > size:
+        rows = rows[:size]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
+
+
+def upcoming_bookings(user, now, after=None, size=20):
+    """One page of the user's bookings for departures after ``now``."""
+    rows = _page(Booking.objects.filter(user=user, departure_time__gt=now), after, size)
+    return _result(rows, size)
+
+
+def past_bookings(user, now, after=None, size=20):
+    """One page of departed bookings, live and archived merged, newest booking first."""
+    live = _page(Booking.objects.filter(user=user, departure_time__lte=now), after, size)
+    archived = _page(ArchivedBooking.objects.filter(user=user), after, size)
+    merged = heapq.merge(live, archived, key=lambda booking: (booking.booking_date, booking.pk), reverse=True)
+    return _result(list(merged)[:size + 1], size)
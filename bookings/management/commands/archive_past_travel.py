@@ -0,0 +1,35 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from bookings.archive import archive_chunk
+
+
+class Command(BaseCommand):
+    help = 'Move departed travel options and their bookings to the archive tables in small chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30,
+                            help='Archive departures older than this many days')
+        parser.add_argument('--chunk-size', type=int, default=200,
+                            help='Travel options moved per transaction')
+        parser.add_argument('--sleep', type=float, default=0.0,
+                            help='Pause between chunks to leave room for live traffic')
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options['days'])
+        total_options = total_bookings = 0
+
+        while True:
+            moved_options, moved_bookings = archive_chunk(before, options['chunk_size'])
+            if not moved_options:
+                break
+            total_options += moved_options
+            total_bookings += moved_bookings
+            self.stdout.write(f'Archived {total_options} travel options, {total_bookings} bookings...')
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {total_options} travel options and {total_bookings} bookings departed before {before:%Y-%m-%d}'
+        ))
@@ -0,0 +1,59 @@
+import threading
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+
+class Command(BaseCommand):
+    help = 'Measure request throughput with per-request vs persistent/pooled database connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000,
+                            help='Simulated requests per thread and mode')
+        parser.add_argument('--threads', type=int, default=1)
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        settings_dict = connections[alias].settings_dict
+        pooled = 'pool' in settings_dict.get('OPTIONS', {})
+        configured = settings_dict['CONN_MAX_AGE']
+
+        self.stdout.write(f"Backend: {settings_dict['ENGINE']} ({'pooled' if pooled else 'unpooled'})")
+        modes = [('reconnect per request', 0)]
+        if pooled:
+            # With a pool, closing a connection returns it to the pool
+            modes = [('pooled', 0)]
+        else:
+            modes.append(('persistent', 600))
+
+        results = {}
+        for label, max_age in modes:
+            settings_dict['CONN_MAX_AGE'] = max_age
+            results[label] = self.run_mode(alias, options['requests'], options['threads'])
+            self.stdout.write(f'{label:>22}: {results[label]:10.1f} req/s')
+        settings_dict['CONN_MAX_AGE'] = configured
+
+        if len(results) == 2:
+            baseline, persistent = results.values()
+            self.stdout.write(self.style.SUCCESS(f'Persistent connections: {persistent / baseline:.1f}x throughput'))
+
+    def run_mode(self, alias, requests, threads):
+        def worker():
+            connection = connections[alias]
+            connection.close()
+            for _ in range(requests):
+                # Mirrors Django's request_started/request_finished signal handlers
+                close_old_connections()
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                close_old_connections()
+            connection.close()
+
+        started = time.perf_counter()
+        pool = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        return requests * threads / (time.perf_counter() - started)
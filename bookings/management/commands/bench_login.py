@@ -0,0 +1,40 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth.hashers import make_password, verify_password
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+PASSWORD = 'correct horse battery staple'
+
+
+class Command(BaseCommand):
+    help = 'Measure login throughput and CPU time per login for each password hasher'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=100, help='Logins per hasher')
+        parser.add_argument('--workers', type=int, default=settings.LOGIN_HASH_WORKERS,
+                            help='Concurrent hashing threads (LOGIN_HASH_WORKERS)')
+        parser.add_argument('--hasher', action='append', choices=sorted(settings.PASSWORD_HASHER_CHOICES),
+                            help='Hasher to measure (repeatable, default: all)')
+
+    def handle(self, *args, **options):
+        names = options['hasher'] or list(settings.PASSWORD_HASHER_CHOICES)
+        logins, workers = options['logins'], options['workers']
+        self.stdout.write(f'{logins} logins per hasher on {workers} hashing thread(s)')
+        self.stdout.write(f"{'hasher':>8} {'logins/s':>10} {'latency ms':>11} {'CPU ms/login':>13}")
+
+        for name in names:
+            with override_settings(PASSWORD_HASHERS=[settings.PASSWORD_HASHER_CHOICES[name]]):
+                encoded = make_password(PASSWORD)
+                wall, cpu = self.measure(encoded, logins, workers)
+            self.stdout.write(
+                f'{name:>8} {logins / wall:10.1f} {wall * 1000 * workers / logins:11.1f} {cpu * 1000 / logins:13.1f}'
+            )
+
+    def measure(self, encoded, logins, workers):
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            started, cpu_started = time.perf_counter(), time.process_time()
+            # process_time() includes every thread, so CPU/login is independent of the worker count
+            list(pool.map(lambda _: verify_password(PASSWORD, encoded), range(logins)))
+            return time.perf_counter() - started, time.process_time() - cpu_started
@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+PAGES = ['bookings:my_bookings', 'accounts:profile', 'bookings:travel_list']
+
+
+class Command(BaseCommand):
+    help = 'Count database queries per authenticated request for each session backend'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20, help='Requests per page and backend')
+        parser.add_argument('--backend', action='append', choices=sorted(settings.SESSION_ENGINES),
+                            help='Backend to measure (repeatable, default: all)')
+
+    def handle(self, *args, **options):
+        backends = options['backend'] or list(settings.SESSION_ENGINES)
+        self.stdout.write(f"{'backend':>15} {'queries/req':>12} {'session queries/req':>20}")
+
+        results = {}
+        for backend in backends:
+            # Roll back the throwaway user and its sessions afterwards
+            with transaction.atomic():
+                results[backend] = self.measure(settings.SESSION_ENGINES[backend], options['requests'])
+                transaction.set_rollback(True)
+            total, session = results[backend]
+            self.stdout.write(f'{backend:>15} {total:12.2f} {session:20.2f}')
+
+        if 'db' in results:
+            baseline = results['db'][0]
+            for backend, (total, _) in results.items():
+                if backend != 'db':
+                    self.stdout.write(self.style.SUCCESS(
+                        f'{backend}: saves {baseline - total:.2f} queries per authenticated request'
+                    ))
+
+    def measure(self, engine, requests):
+        with override_settings(SESSION_ENGINE=engine, ALLOWED_HOSTS=['testserver'], RATELIMIT_ENABLED=False):
+            caches[settings.SESSION_CACHE_ALIAS].clear()
+            client = Client()
+            client.force_login(User.objects.create_user(username='bench-sessions', password=None))
+            # The first request after login may populate the session cache
+            client.get(reverse(PAGES[0]))
+
+            total = session = count = 0
+            for _ in range(requests):
+                for page in PAGES:
+                    with CaptureQueriesContext(connection) as queries:
+                        client.get(reverse(page))
+                    total += len(queries)
+                    session += sum('django_session' in query['sql'] for query in queries)
+                    count += 1
+        return total / count, session / count
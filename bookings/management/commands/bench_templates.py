@@ -0,0 +1,85 @@
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.template import engines
+from django.template.backends.django import DjangoTemplates
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.utils import timezone
+from bookings.forms import FilterForm
+from bookings.models import TravelOption
+
+UNCACHED_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+NO_FRAGMENT_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'template_fragments': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+class Command(BaseCommand):
+    help = 'Benchmark travel_list rendering with and without template/fragment caching'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cards', type=int, default=50)
+        parser.add_argument('--iterations', type=int, default=200)
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        travels = [
+            TravelOption(
+                id=uuid.uuid4(),
+                travel_id=f'F{i:04d}',
+                type=('FLIGHT', 'TRAIN', 'BUS')[i % 3],
+                source='New York',
+                destination='Los Angeles',
+                date_time=now + timedelta(days=1, hours=i),
+                price=Decimal('99.99') + i,
+                available_seats=i % 7,
+                total_seats=100
+            )
+            for i in range(options['cards'])
+        ]
+        page = Paginator(travels, options['cards']).get_page(1)
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        context = {
+            'page_obj': page,
+            'form': FilterForm(),
+            'card_cache_timeout': settings.TRAVEL_CARD_CACHE_TIMEOUT,
+        }
+
+        uncached = self.engine_without_loader_cache()
+        cached = engines['django']
+        iterations = options['iterations']
+
+        with override_settings(CACHES=NO_FRAGMENT_CACHE):
+            baseline = self.measure(uncached, context, request, iterations)
+            loader_only = self.measure(cached, context, request, iterations)
+        fragments = self.measure(cached, context, request, iterations)
+
+        self.stdout.write(f"{options['cards']}-card travel_list page, {iterations} renders each:")
+        self.stdout.write(f'  no caching:                     {baseline:7.2f} ms/render')
+        self.stdout.write(f'  cached loader:                  {loader_only:7.2f} ms/render ({baseline / loader_only:.1f}x)')
+        self.stdout.write(f'  cached loader + card fragments: {fragments:7.2f} ms/render ({baseline / fragments:.1f}x)')
+
+    def engine_without_loader_cache(self):
+        config = {key: value for key, value in settings.TEMPLATES[0].items() if key != 'BACKEND'}
+        config['OPTIONS'] = dict(config['OPTIONS'], loaders=UNCACHED_LOADERS)
+        config.update(NAME='uncached', APP_DIRS=False)
+        return DjangoTemplates(config)
+
+    def measure(self, engine, context, request, iterations):
+        # Warm-up render fills the loader and fragment caches where enabled
+        engine.get_template('bookings/travel_list.html').render(context, request)
+        started = time.perf_counter()
+        for _ in range(iterations):
+            engine.get_template('bookings/travel_list.html').render(context, request)
+        return (time.perf_counter() - started) * 1000 / iterations
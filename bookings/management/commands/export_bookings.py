@@ -0,0 +1,55 @@
+import sys
+import time
+from django.core.management.base import BaseCommand, CommandError
+from bookings.exports import FORMATS, export_rows, export_stream
+from bookings.forms import ExportForm
+
+
+class Command(BaseCommand):
+    help = 'Stream bookings (live and archived) with user and travel details as CSV or JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', default='-', help="Output file, '-' for stdout")
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--gzip', action='store_true', help='Compress (implied by a .gz output name)')
+        parser.add_argument('--from', dest='date_from', help='First booking date, YYYY-MM-DD')
+        parser.add_argument('--to', dest='date_to', help='Last booking date, YYYY-MM-DD')
+        parser.add_argument('--status', choices=['CONFIRMED', 'CANCELLED'])
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched per database round trip')
+
+    def handle(self, *args, **options):
+        form = ExportForm({
+            'format': options['format'],
+            'date_from': options['date_from'],
+            'date_to': options['date_to'],
+            'status': options['status'],
+        })
+        if not form.is_valid():
+            raise CommandError(' '.join(error for errors in form.errors.values() for error in errors))
+        filters = form.cleaned_data
+        output = options['output']
+        compress = options['gzip'] or output.endswith('.gz')
+
+        count = 0
+
+        def counted(rows):
+            nonlocal count
+            for row in rows:
+                count += 1
+                yield row
+
+        started = time.monotonic()
+        rows = counted(export_rows(filters['date_from'], filters['date_to'], filters['status'],
+                                   chunk_size=options['chunk_size']))
+        stream = sys.stdout.buffer if output == '-' else open(output, 'wb')
+        try:
+            for piece in export_stream(rows, filters['format'], compress):
+                stream.write(piece)
+        finally:
+            if stream is sys.stdout.buffer:
+                stream.flush()
+            else:
+                stream.close()
+
+        elapsed = time.monotonic() - started
+        self.stderr.write(f'Exported {count} bookings in {elapsed:.1f}s ({count / elapsed if elapsed else 0:.0f}/s)')
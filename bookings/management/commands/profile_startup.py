@@ -0,0 +1,127 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter: times each startup phase and every AppConfig.ready()
+STARTUP_SCRIPT = '''
+import json, time
+started = time.perf_counter()
+from django.apps.config import AppConfig
+ready = {}
+create = AppConfig.create.__func__
+
+def timed_create(cls, entry):
+    config = create(cls, entry)
+    original = config.ready
+
+    def timed_ready():
+        began = time.perf_counter()
+        original()
+        ready[config.label] = time.perf_counter() - began
+    config.ready = timed_ready
+    return config
+
+AppConfig.create = classmethod(timed_create)
+import django
+from django.core.handlers.wsgi import WSGIHandler
+from django.urls import get_resolver
+phases = {'import': time.perf_counter()}
+django.setup(set_prefix=False)
+phases['setup'] = time.perf_counter()
+WSGIHandler()
+phases['middleware'] = time.perf_counter()
+get_resolver().url_patterns
+phases['urls'] = time.perf_counter()
+previous, durations = started, {}
+for name, at in phases.items():
+    durations[name], previous = at - previous, at
+print(json.dumps({'phases': durations, 'ready': ready}))
+'''
+PHASES = [
+    ('import', 'imports'),
+    ('setup', 'django.setup()'),
+    ('middleware', 'middleware'),
+    ('urls', 'URLconf'),
+]
+
+
+class Command(BaseCommand):
+    help = ('Profile cold start: per-phase and per-AppConfig.ready() timings, '
+            'plus a summary of python -X importtime')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', action='append', dest='profiles', metavar='SETTINGS_MODULE',
+                            help='Settings module to profile; repeat to compare (default: current settings)')
+        parser.add_argument('--runs', type=int, default=5, help='Cold starts to time per profile')
+        parser.add_argument('--top', type=int, default=15, help='Modules and packages to list')
+
+    def handle(self, *args, **options):
+        profiles = options['profiles'] or [settings.SETTINGS_MODULE]
+        if options['runs'] < 1:
+            raise CommandError('--runs must be at least 1')
+        results = {}
+        for profile in profiles:
+            results[profile] = self.profile(profile, options['runs'], options['top'])
+
+        if len(results) > 1:
+            baseline_name, baseline = profiles[0], results[profiles[0]]
+            self.stdout.write(f'\nCold start compared with {baseline_name}:')
+            for profile in profiles[1:]:
+                change = (results[profile] - baseline) / baseline
+                self.stdout.write(f'  {profile}: {results[profile] * 1000:.0f} ms ({change:+.0%})')
+
+    def profile(self, module, runs, top):
+        samples = sorted((self.start(module) for _ in range(runs)), key=lambda sample: sample[0])
+        wall = statistics.median(sample[0] for sample in samples)
+        # The breakdown comes from the median run, not whichever ran in the middle
+        _, report = samples[len(samples) // 2]
+        self.stdout.write(self.style.MIGRATE_HEADING(module))
+        self.stdout.write(f'  cold start {wall * 1000:.0f} ms (median of {runs}, including interpreter startup)')
+        phases = ', '.join(f"{label} {report['phases'][key] * 1000:.0f} ms" for key, label in PHASES)
+        self.stdout.write(f'  {phases}')
+        ready = sorted(report['ready'].items(), key=lambda item: -item[1])
+        self.stdout.write('  ready(): ' + ', '.join(f'{label} {seconds * 1000:.1f} ms' for label, seconds in ready))
+
+        modules = self.import_times(module)
+        packages = defaultdict(int)
+        for name, own, _ in modules:
+            packages[name.split('.')[0]] += own
+        self.stdout.write(f'  -X importtime: {len(modules)} modules, '
+                          f'{sum(own for _, own, _ in modules) / 1000:.0f} ms (includes tracing overhead)')
+        self.stdout.write('  by top-level package:')
+        for name, own in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+            self.stdout.write(f'    {own / 1000:8.1f} ms  {name}')
+        self.stdout.write('  slowest modules (self / cumulative):')
+        for name, own, cumulative in sorted(modules, key=lambda item: -item[1])[:top]:
+            self.stdout.write(f'    {own / 1000:8.1f} / {cumulative / 1000:7.1f} ms  {name}')
+        return wall
+
+    def run_child(self, module, *flags):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=module)
+        result = subprocess.run([sys.executable, *flags, '-c', STARTUP_SCRIPT], cwd=settings.BASE_DIR,
+                                env=env, capture_output=True, text=True)
+        if result.returncode:
+            raise CommandError(f'Startup with {module} failed:\n{result.stderr}')
+        return result
+
+    def start(self, module):
+        started = time.perf_counter()
+        result = self.run_child(module)
+        return time.perf_counter() - started, json.loads(result.stdout.splitlines()[-1])
+
+    def import_times(self, module):
+        """Return (module, self us, cumulative us) for every import of one startup."""
+        modules = []
+        for line in self.run_child(module, '-X', 'importtime').stderr.splitlines():
+            if not line.startswith('import time:'):
+                continue
+            own, cumulative, name = line[len('import time:'):].split('|')
+            if own.strip().isdigit():
+                modules.append((name.strip(), int(own), int(cumulative)))
+        return modules
@@ -0,0 +1,35 @@
+import time
+from django.core.management.base import BaseCommand
+from bookings.tasks import enqueue_promoted
+from bookings.waitlist import expire_departed, promote_waitlist, pending_travel_options
+
+
+class Command(BaseCommand):
+    help = 'Promote waitlisted users into freed seats, oldest request first, and expire departed entries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Entries promoted per transaction (default: WAITLIST_BATCH_SIZE)')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep running and sweep every --interval seconds')
+        parser.add_argument('--interval', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        while True:
+            expired = expire_departed()
+            if expired:
+                self.stdout.write(f'Expired {expired} waitlist entries for departed journeys')
+            promoted = self.sweep(options['batch_size'])
+            if promoted:
+                self.stdout.write(self.style.SUCCESS(f'Promoted {promoted} waitlist entries'))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+    def sweep(self, batch_size):
+        promoted = 0
+        for travel_id in list(pending_travel_options()):
+            entries = promote_waitlist(travel_id, batch_size=batch_size)
+            enqueue_promoted(entries)
+            promoted += len(entries)
+        return promoted
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from bookings.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = 'Delete booking idempotency keys older than BOOKING_IDEMPOTENCY_TTL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        cutoff = IdempotencyKey.expiry_cutoff()
+        purged = 0
+        while True:
+            ids = list(
+                IdempotencyKey.objects.filter(created_at__lt=cutoff)
+                .values_list('id', flat=True)[:options['chunk_size']]
+            )
+            if not ids:
+                break
+            purged += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f'Purged {purged} expired idempotency keys'))
@@ -0,0 +1,48 @@
+import sys
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from bookings.outbox import purge_events, relay_batch, serialize
+
+
+class Command(BaseCommand):
+    help = 'Stream booking outbox events to a consumer as JSON Lines, in order, with a checkpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('consumer', help='Checkpoint name, e.g. analytics or partner-feed')
+        parser.add_argument('--output', '-o', default='-', help="File to append to, '-' for stdout")
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Events per batch (default: OUTBOX_BATCH_SIZE)')
+        parser.add_argument('--follow', action='store_true', help='Keep polling for new events')
+        parser.add_argument('--interval', type=float, default=0.5,
+                            help='Seconds to sleep when caught up (with --follow)')
+        parser.add_argument('--purge-days', type=int, default=settings.OUTBOX_RETENTION_DAYS,
+                            help='Delete events older than this many days that every consumer has read')
+
+    def handle(self, *args, **options):
+        purged = purge_events(options['purge_days'])
+        if purged:
+            self.stderr.write(f'Purged {purged} relayed events')
+
+        output = sys.stdout if options['output'] == '-' else open(options['output'], 'a', encoding='utf-8')
+
+        def send(events):
+            output.write(''.join(serialize(event) + '\n' for event in events))
+            output.flush()
+
+        sent = 0
+        try:
+            while True:
+                count = relay_batch(options['consumer'], send, options['batch_size'])
+                sent += count
+                if count:
+                    continue
+                if not options['follow']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        self.stderr.write(f"Relayed {sent} events to {options['consumer']}")
@@ -0,0 +1,38 @@
+import time
+from django.core.management.base import BaseCommand
+from bookings.models import Booking
+from bookings.tickets import render_tickets
+
+
+class Command(BaseCommand):
+    help = 'Pre-render e-ticket PDFs in bulk (e.g. after bumping TICKET_TEMPLATE_VERSION)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Render processes (default: TICKET_RENDER_WORKERS)')
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Bookings loaded and rendered per chunk')
+        parser.add_argument('--status', choices=['CONFIRMED', 'CANCELLED'], default=None)
+        parser.add_argument('--force', action='store_true',
+                            help='Re-render tickets that are already cached')
+
+    def handle(self, *args, **options):
+        bookings = Booking.objects.select_related('user', 'travel_option').order_by('booking_date')
+        if options['status']:
+            bookings = bookings.filter(status=options['status'])
+
+        started = time.monotonic()
+        rendered = 0
+        chunk = []
+        for booking in bookings.iterator(chunk_size=options['chunk_size']):
+            chunk.append(booking)
+            if len(chunk) == options['chunk_size']:
+                rendered += len(render_tickets(chunk, workers=options['workers'], force=options['force']))
+                chunk = []
+        if chunk:
+            rendered += len(render_tickets(chunk, workers=options['workers'], force=options['force']))
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Rendered {rendered} tickets in {elapsed:.1f}s ({rendered / elapsed if elapsed else 0:.1f}/s)'
+        ))
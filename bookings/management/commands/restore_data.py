@@ -0,0 +1,26 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from bookings.snapshots import SnapshotError, restore_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Load a snapshot written by snapshot_data into an empty (or --flush-ed) database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--flush', action='store_true',
+                            help='Delete existing users, travel options and bookings first')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        try:
+            with open(options['path'], 'rb') as stream:
+                counts = restore_snapshot(stream, flush=options['flush'], using=options['database'])
+        except SnapshotError as exc:
+            raise CommandError(exc)
+        for label, count in counts.items():
+            self.stdout.write(f'{label:>30}: {count} rows')
+        self.stdout.write(self.style.SUCCESS(
+            f'Restored {sum(counts.values())} rows in {time.monotonic() - started:.1f}s'
+        ))
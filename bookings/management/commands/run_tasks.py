@@ -0,0 +1,42 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from bookings.models import Task
+from bookings.tasks import claim_tasks, run_tasks
+
+
+class Command(BaseCommand):
+    help = 'Run queued background tasks (emails, analytics, waitlist promotion)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Tasks claimed per pass (default: TASK_BATCH_SIZE)')
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once the queue is drained')
+        parser.add_argument('--purge-days', type=int, default=7,
+                            help='Delete finished tasks older than this many days on startup')
+
+    def handle(self, *args, **options):
+        purged, _ = Task.objects.filter(
+            status='DONE',
+            updated_at__lt=timezone.now() - timedelta(days=options['purge_days'])
+        ).delete()
+        if purged:
+            self.stdout.write(f'Purged {purged} finished tasks')
+
+        try:
+            while True:
+                tasks = claim_tasks(options['batch_size'])
+                if tasks:
+                    done, failed = run_tasks(tasks)
+                    self.stdout.write(f'Ran {done + failed} tasks ({done} done, {failed} failed)')
+                    continue
+                if options['burst']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS('Worker stopped'))
@@ -0,0 +1,25 @@
+import time
+from django.core.management.base import BaseCommand
+from bookings.snapshots import write_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Dump users, profiles, travel options and bookings to a compact compressed snapshot file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per compressed frame')
+        parser.add_argument('--level', type=int, default=6, choices=range(1, 10), help='zlib compression level')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        with open(options['path'], 'wb') as stream:
+            counts = write_snapshot(stream, options['chunk_size'], options['level'], options['database'])
+            size = stream.tell()
+        for label, count in counts.items():
+            self.stdout.write(f'{label:>30}: {count} rows')
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {sum(counts.values())} rows ({size / 1024:.0f} KiB) to {options['path']} "
+            f'in {time.monotonic() - started:.1f}s'
+        ))
@@ -0,0 +1,92 @@
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from bookings.stress import check_invariants, create_fixtures, delete_fixtures, run_workers
+
+
+class Command(BaseCommand):
+    help = ('Fire concurrent book/cancel requests at the configured database from threads '
+            'and processes, then check seat and ID invariants')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--operations', type=int, default=2000, help='Total book/cancel requests')
+        parser.add_argument('--threads', type=int, default=8, help='Threads per process')
+        parser.add_argument('--processes', type=int, default=1,
+                            help='Worker processes (1 runs the threads in this process)')
+        parser.add_argument('--users', type=int, default=20, help='Users shared by all workers')
+        parser.add_argument('--travel-options', type=int, default=5)
+        parser.add_argument('--seats', type=int, default=100, help='Seats per travel option')
+        parser.add_argument('--cancel-ratio', type=float, default=0.3)
+        parser.add_argument('--retries', type=int, default=5, help='Retries after a lock or integrity error')
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--keep', action='store_true', help='Keep the generated users, trips and bookings')
+        parser.add_argument('--check-only', action='store_true',
+                            help='Only check invariants over the whole database')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Database: {connection.vendor} ({connection.settings_dict['NAME']})")
+        if options['check_only']:
+            return self.report_invariants(check_invariants())
+
+        processes, threads, operations = options['processes'], options['threads'], options['operations']
+        if processes < 1 or threads < 1 or operations < 1:
+            raise CommandError('--processes, --threads and --operations must be positive')
+        prefix = f'stress-{uuid.uuid4().hex[:8]}'
+        user_ids, travel_ids = create_fixtures(prefix, options['users'], options['travel_options'], options['seats'])
+        worker_options = {key: options[key] for key in ('cancel_ratio', 'retries')}
+
+        started = time.monotonic()
+        try:
+            if processes == 1:
+                counts = run_workers(threads, operations, user_ids, travel_ids,
+                                     seed=options['seed'], **worker_options)
+            else:
+                counts = Counter()
+                # Children must open their own connections, not inherit ours through fork()
+                connections.close_all()
+                share, extra = divmod(operations, processes)
+                with ProcessPoolExecutor(max_workers=processes, initializer=django.setup) as pool:
+                    futures = [
+                        pool.submit(run_workers, threads, share + (i < extra), user_ids, travel_ids,
+                                    seed=None if options['seed'] is None else options['seed'] + i,
+                                    **worker_options)
+                        for i in range(processes)
+                    ]
+                    for future in futures:
+                        counts.update(future.result())
+            elapsed = time.monotonic() - started
+            self.report_run(counts, elapsed, processes, threads)
+            problems = check_invariants(travel_ids)
+        finally:
+            if not options['keep']:
+                delete_fixtures(user_ids, travel_ids)
+        self.report_invariants(problems)
+
+    def report_run(self, counts, elapsed, processes, threads):
+        completed = sum(counts[key] for key in ('booked', 'sold_out', 'cancelled', 'cancel_refused',
+                                                 'nothing_to_cancel'))
+        attempts = completed + counts['failed'] + counts['retries']
+        self.stdout.write(f'{processes} process(es) x {threads} thread(s): {completed} requests '
+                          f'in {elapsed:.1f}s ({completed / elapsed:.0f}/s)')
+        self.stdout.write(f"  booked {counts['booked']}, sold out {counts['sold_out']}")
+        self.stdout.write(f"  cancelled {counts['cancelled']}, refused {counts['cancel_refused']}, "
+                          f"nothing to cancel {counts['nothing_to_cancel']}")
+        # Refused cancels lost a race with another cancel of the same booking
+        conflicts = counts['sold_out'] + counts['cancel_refused']
+        self.stdout.write(f'  conflicts {conflicts} ({conflicts / completed if completed else 0:.1%} of requests)')
+        self.stdout.write(f"  retries {counts['retries']} ({counts['retries'] / attempts if attempts else 0:.1%} "
+                          f"of attempts), failed after retrying {counts['failed']}")
+        for key in sorted(counts):
+            if key.startswith('error:'):
+                self.stdout.write(f'    {key[6:]}: {counts[key]}')
+
+    def report_invariants(self, problems):
+        if problems:
+            for problem in problems:
+                self.stderr.write(problem)
+            raise CommandError(f'{len(problems)} invariant violation(s)')
+        self.stdout.write(self.style.SUCCESS('Invariants hold: seats balance and IDs are unique'))
@@ -0,0 +1,32 @@
+import time
+from django.core.management.base import BaseCommand
+from bookings.summaries import stale_bookings, sync_chunk
+
+
+class Command(BaseCommand):
+    help = "Copy travel option schedules into bookings' denormalized summary columns in small chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Bookings rewritten per transaction')
+        parser.add_argument('--sleep', type=float, default=0.0,
+                            help='Pause between chunks to leave room for live traffic')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only count the bookings that are out of date')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            self.stdout.write(f'{stale_bookings().count()} bookings have stale summary columns')
+            return
+
+        total = 0
+        while True:
+            fixed = sync_chunk(options['chunk_size'])
+            if not fixed:
+                break
+            total += fixed
+            self.stdout.write(f'Synced {total} bookings...')
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f'Synced {total} bookings'))
@@ -0,0 +1,49 @@
+import re
+from pathlib import Path
+from urllib.parse import urljoin
+from urllib.request import urlopen
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# (path under VENDOR_ASSETS_SOURCE, path under static/vendor); versions match the CDN links in base.html
+VENDOR_ASSETS = [
+    ('bootstrap@5.3.0/dist/css/bootstrap.min.css', 'bootstrap/css/bootstrap.min.css'),
+    ('bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js', 'bootstrap/js/bootstrap.bundle.min.js'),
+    ('bootstrap-icons@1.10.0/font/bootstrap-icons.css', 'bootstrap-icons/bootstrap-icons.css'),
+    ('bootstrap-icons@1.10.0/font/fonts/bootstrap-icons.woff2', 'bootstrap-icons/fonts/bootstrap-icons.woff2'),
+    ('bootstrap-icons@1.10.0/font/fonts/bootstrap-icons.woff', 'bootstrap-icons/fonts/bootstrap-icons.woff'),
+]
+# Source maps are not vendored, and the manifest storage rejects references to missing files
+SOURCE_MAP_RE = re.compile(rb'\n?(/\*# sourceMappingURL=[^*]*\*/|//# sourceMappingURL=\S*)\s*$')
+
+
+class Command(BaseCommand):
+    help = 'Download Bootstrap and Bootstrap Icons into static/vendor for VENDORED_ASSETS deployments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', default=settings.VENDOR_ASSETS_SOURCE,
+                            help='Base URL of an npm CDN or internal mirror')
+        parser.add_argument('--force', action='store_true', help='Download files that already exist')
+
+    def handle(self, *args, **options):
+        source = options['source'].rstrip('/') + '/'
+        target = Path(settings.BASE_DIR) / 'static' / 'vendor'
+        fetched = 0
+        for remote, local in VENDOR_ASSETS:
+            path = target / local
+            if path.exists() and not options['force']:
+                continue
+            url = urljoin(source, remote)
+            try:
+                with urlopen(url, timeout=30) as response:
+                    content = response.read()
+            except OSError as exc:
+                raise CommandError(f'Could not download {url}: {exc}')
+            if path.suffix in ('.css', '.js'):
+                content = SOURCE_MAP_RE.sub(b'\n', content)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(content)
+            fetched += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Vendored {fetched} file(s) into {target}; run collectstatic and set VENDORED_ASSETS=True'
+        ))
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0002_rename_seats_booking_number_of_seats_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number_of_seats', models.PositiveIntegerField(default=1)),
+                ('status', models.CharField(choices=[('WAITING', 'Waiting'), ('PROMOTED', 'Promoted'), ('EXPIRED', 'Expired'), ('CANCELLED', 'Cancelled')], default='WAITING', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('promoted_at', models.DateTimeField(blank=True, null=True)),
+                ('booking', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='waitlist_entry', to='bookings.booking')),
+                ('travel_option', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='bookings.traveloption')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'waitlist entries',
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['travel_option', 'status', 'created_at'], name='waitlist_queue_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 'WAITING')), fields=('user', 'travel_option'), name='unique_waiting_entry')],
+            },
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_brin_indexes(apps, schema_editor):
+    # Archive rows arrive in departure order, so tiny BRIN indexes give cheap
+    # date-range scans on PostgreSQL
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX archived_travel_date_brin ON bookings_archivedtraveloption USING brin (date_time)'
+    )
+
+
+def drop_brin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS archived_travel_date_brin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0005_idempotencykey'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTravelOption',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('travel_id', models.CharField(blank=True, max_length=20, null=True)),
+                ('type', models.CharField(choices=[('FLIGHT', 'Flight'), ('TRAIN', 'Train'), ('BUS', 'Bus')], max_length=10)),
+                ('source', models.CharField(max_length=100)),
+                ('destination', models.CharField(max_length=100)),
+                ('date_time', models.DateTimeField()),
+                ('price', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('available_seats', models.PositiveIntegerField()),
+                ('total_seats', models.PositiveIntegerField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['date_time'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='booking_date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='traveloption',
+            name='date_time',
+            field=models.DateTimeField(db_index=True),
+        ),
+        migrations.CreateModel(
+            name='ArchivedBooking',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('booking_id', models.CharField(blank=True, max_length=20, null=True)),
+                ('number_of_seats', models.PositiveIntegerField()),
+                ('total_price', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('booking_date', models.DateTimeField(db_index=True)),
+                ('status', models.CharField(choices=[('CONFIRMED', 'Confirmed'), ('CANCELLED', 'Cancelled')], max_length=10)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('travel_option', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='bookings.archivedtraveloption')),
+            ],
+            options={
+                'ordering': ['-booking_date'],
+                'indexes': [models.Index(fields=['user', 'booking_date'], name='archived_booking_user_idx')],
+            },
+        ),
+        migrations.RunPython(create_brin_indexes, drop_brin_indexes),
+    ]
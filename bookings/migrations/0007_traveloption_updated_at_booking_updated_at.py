@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0006_archivedtraveloption_alter_booking_booking_date_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='traveloption',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0007_traveloption_updated_at_booking_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxCheckpoint',
+            fields=[
+                ('consumer', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('last_event_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('booking.confirmed', 'Booking confirmed'), ('booking.cancelled', 'Booking cancelled')], max_length=50)),
+                ('booking', models.UUIDField(db_index=True)),
+                ('payload', models.JSONField()),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+    ]
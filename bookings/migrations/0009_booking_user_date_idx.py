@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0008_outboxevent_outboxcheckpoint'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', 'booking_date'], name='booking_user_date_idx'),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:21
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+SUMMARY_FIELDS = {
+    'departure_time': 'date_time',
+    'travel_type': 'type',
+    'source': 'source',
+    'destination': 'destination',
+}
+
+
+def copy_summaries(apps, schema_editor):
+    for booking_model, travel_model in [('Booking', 'TravelOption'),
+                                        ('ArchivedBooking', 'ArchivedTravelOption')]:
+        travel = apps.get_model('bookings', travel_model).objects.filter(pk=OuterRef('travel_option_id'))
+        apps.get_model('bookings', booking_model).objects.update(**{
+            field: Subquery(travel.values(source)[:1]) for field, source in SUMMARY_FIELDS.items()
+        })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0009_booking_user_date_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedbooking',
+            name='departure_time',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedbooking',
+            name='destination',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='archivedbooking',
+            name='source',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='archivedbooking',
+            name='travel_type',
+            field=models.CharField(blank=True, choices=[('FLIGHT', 'Flight'), ('TRAIN', 'Train'), ('BUS', 'Bus')], max_length=10),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='departure_time',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='destination',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='source',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='travel_type',
+            field=models.CharField(blank=True, choices=[('FLIGHT', 'Flight'), ('TRAIN', 'Train'), ('BUS', 'Bus')], editable=False, max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', 'departure_time'], name='booking_user_departure_idx'),
+        ),
+        migrations.RunPython(copy_summaries, migrations.RunPython.noop),
+    ]
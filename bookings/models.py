@@ -1,8 +1,37 @@
-from django.db import models
+from datetime import timedelta
+from django.conf import settings
+from django.db import models, transaction, IntegrityError
 from django.contrib.auth.models import User
 from django.utils import timezone
 import uuid
 
+# Human-readable IDs are numbered from a row count, so concurrent inserts can
+# pick the same one; the loser moves on to the next number
+CODE_ATTEMPTS = 5
+
+# Booking column -> TravelOption field it is copied from, so booking lists
+# can be read and filtered without joining travel options
+SUMMARY_FIELDS = {
+    'departure_time': 'date_time',
+    'travel_type': 'type',
+    'source': 'source',
+    'destination': 'destination',
+}
+
+
+def save_with_code(instance, field, make_code, save):
+    """Run ``save`` with ``field`` set to ``make_code(attempt)``, retrying on collisions."""
+    for attempt in range(CODE_ATTEMPTS):
+        setattr(instance, field, make_code(attempt))
+        try:
+            with transaction.atomic():
+                return save()
+        except IntegrityError:
+            taken = type(instance)._default_manager.filter(**{field: getattr(instance, field)}).exists()
+            if not taken or attempt == CODE_ATTEMPTS - 1:
+                setattr(instance, field, None)
+                raise
+
 
 class TravelOption(models.Model):
     TYPE_CHOICES = [
@@ -16,21 +45,43 @@ class TravelOption(models.Model):
     type = models.CharField(max_length=10, choices=TYPE_CHOICES)
     source = models.CharField(max_length=100)
     destination = models.CharField(max_length=100)
-    date_time = models.DateTimeField()
+    date_time = models.DateTimeField(db_index=True)
     price = models.DecimalField(max_digits=8, decimal_places=2)
     available_seats = models.PositiveIntegerField()
     total_seats = models.PositiveIntegerField(default=100)  # Track total capacity
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # Drives listing ETags
     
     class Meta:
         ordering = ['date_time']
-    
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        loaded = dict(zip(field_names, values))
+        if all(loaded.get(source, models.DEFERRED) is not models.DEFERRED for source in SUMMARY_FIELDS.values()):
+            instance._loaded_summary = {field: loaded[source] for field, source in SUMMARY_FIELDS.items()}
+        return instance
+
+    def summary(self):
+        """The values this option's bookings carry in their summary columns."""
+        return {field: getattr(self, source) for field, source in SUMMARY_FIELDS.items()}
+
     def save(self, *args, **kwargs):
-        if not self.travel_id:
+        if not self._state.adding and self.summary() != getattr(self, '_loaded_summary', None):
+            # Reschedules and renames are rare; copy them to every booking in the same transaction
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                Booking.objects.filter(travel_option=self).update(updated_at=timezone.now(), **self.summary())
+        elif not self.travel_id:
             # Generate human-readable travel ID
             prefix = self.type[0]  # F, T, or B
-            count = TravelOption.objects.filter(type=self.type).count() + 1
-            self.travel_id = f"{prefix}{count:04d}"
-        super().save(*args, **kwargs)
+            count = (TravelOption.objects.filter(type=self.type).count()
+                     + ArchivedTravelOption.objects.filter(type=self.type).count() + 1)
+            save_with_code(self, 'travel_id', lambda attempt: f"{prefix}{count + attempt:04d}",
+                           lambda: super(TravelOption, self).save(*args, **kwargs))
+        else:
+            super().save(*args, **kwargs)
+        self._loaded_summary = self.summary()
     
     def __str__(self):
         return f"{self.travel_id}: {self.type} {self.source} → {self.destination}"
@@ -52,36 +103,283 @@ class Booking(models.Model):
     travel_option = models.ForeignKey(TravelOption, on_delete=models.CASCADE)
     number_of_seats = models.PositiveIntegerField(default=1)  # Match requirement naming
     total_price = models.DecimalField(max_digits=8, decimal_places=2)
-    booking_date = models.DateTimeField(auto_now_add=True)
+    booking_date = models.DateTimeField(auto_now_add=True, db_index=True)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='CONFIRMED')
+    updated_at = models.DateTimeField(auto_now=True)
+    # Copied from travel_option (see SUMMARY_FIELDS); sync_booking_summaries repairs drift
+    departure_time = models.DateTimeField(null=True, blank=True, editable=False)
+    travel_type = models.CharField(max_length=10, choices=TravelOption.TYPE_CHOICES, blank=True, editable=False)
+    source = models.CharField(max_length=100, blank=True, editable=False)
+    destination = models.CharField(max_length=100, blank=True, editable=False)
     
     class Meta:
         ordering = ['-booking_date']
+        indexes = [
+            models.Index(fields=['user', 'booking_date'], name='booking_user_date_idx'),
+            models.Index(fields=['user', 'departure_time'], name='booking_user_departure_idx'),
+        ]
     
     def save(self, *args, **kwargs):
-        if not self.booking_id:
-            # Generate human-readable booking ID
-            from datetime import datetime
-            date_str = datetime.now().strftime("%Y%m%d")
-            count = Booking.objects.filter(booking_date__date=datetime.now().date()).count() + 1
-            self.booking_id = f"BK{date_str}{count:03d}"
-            
+        if self._state.adding or Booking.travel_option.is_cached(self):
+            for field, value in self.travel_option.summary().items():
+                setattr(self, field, value)
+
         # Ensure we have a booking date
         if not hasattr(self, 'booking_date') or not self.booking_date:
             self.booking_date = timezone.now()
         
         if not self.total_price:
             self.total_price = self.travel_option.price * self.number_of_seats
+
+        if not self.booking_id:
+            # Generate human-readable booking ID
+            from datetime import datetime
+            date_str = datetime.now().strftime("%Y%m%d")
+            today = datetime.now().date()
+            count = (Booking.objects.filter(booking_date__date=today).count()
+                     + ArchivedBooking.objects.filter(booking_date__date=today).count() + 1)
+            return save_with_code(self, 'booking_id', lambda attempt: f"BK{date_str}{count + attempt:03d}",
+                                  lambda: super(Booking, self).save(*args, **kwargs))
         super().save(*args, **kwargs)
     
     def __str__(self):
         return f"Booking {self.booking_id} - {self.user.username}"
     
     def cancel(self):
-        if self.status == 'CONFIRMED' and self.travel_option.date_time > timezone.now():
+        if self.status != 'CONFIRMED' or self.travel_option.date_time <= timezone.now():
+            return False
+
+        with transaction.atomic():
+            travel = TravelOption.objects.select_for_update().get(pk=self.travel_option_id)
+            # A concurrent cancel of the same booking may have committed since it was read
+            if Booking.objects.filter(pk=self.pk).values_list('status', flat=True).get() != 'CONFIRMED':
+                return False
             self.status = 'CANCELLED'
-            self.travel_option.available_seats += self.number_of_seats
-            self.travel_option.save()
+            travel.available_seats += self.number_of_seats
+            self.travel_option = travel
             self.save()
-            return True
-        return False
\ No newline at end of file
+            OutboxEvent.record('booking.cancelled', self)
+
+            # Freed seats go to the waitlist under the same lock, so book_travel
+            # can never take them ahead of the queue
+            from .tasks import enqueue_promoted
+            from .waitlist import promote_into
+            promoted, _ = promote_into(travel, limit=travel.available_seats)
+            travel.save()
+            if promoted:
+                transaction.on_commit(lambda: enqueue_promoted(promoted))
+        return True
+
+
+class WaitlistEntry(models.Model):
+    STATUS_CHOICES = [
+        ('WAITING', 'Waiting'),
+        ('PROMOTED', 'Promoted'),
+        ('EXPIRED', 'Expired'),
+        ('CANCELLED', 'Cancelled'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    travel_option = models.ForeignKey(TravelOption, on_delete=models.CASCADE, related_name='waitlist_entries')
+    number_of_seats = models.PositiveIntegerField(default=1)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='WAITING')
+    booking = models.OneToOneField(Booking, on_delete=models.SET_NULL, null=True, blank=True, related_name='waitlist_entry')
+    created_at = models.DateTimeField(auto_now_add=True)
+    promoted_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at', 'id']
+        verbose_name_plural = 'waitlist entries'
+        indexes = [
+            models.Index(fields=['travel_option', 'status', 'created_at'], name='waitlist_queue_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'travel_option'],
+                condition=models.Q(status='WAITING'),
+                name='unique_waiting_entry',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Waitlist {self.user.username} - {self.travel_option.travel_id} ({self.status})"
+
+    def cancel(self):
+        if self.status != 'WAITING':
+            return False
+        self.status = 'CANCELLED'
+        self.save(update_fields=['status'])
+        return True
+
+
+class Task(models.Model):
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('DONE', 'Done'),
+        ('FAILED', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    idempotency_key = models.CharField(max_length=200, unique=True, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['run_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='task_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+
+class IdempotencyKey(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    key = models.CharField(max_length=64)
+    booking = models.ForeignKey(Booking, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username}:{self.key}"
+
+    @classmethod
+    def expiry_cutoff(cls):
+        return timezone.now() - timedelta(seconds=settings.BOOKING_IDEMPOTENCY_TTL)
+
+    @classmethod
+    def lookup(cls, user, key):
+        return cls.objects.filter(
+            user=user,
+            key=key,
+            created_at__gte=cls.expiry_cutoff()
+        ).select_related('booking').first()
+
+    @classmethod
+    def claim(cls, user, key):
+        """Reserve ``key`` for the current transaction.
+
+        Returns None when the caller owns the key, otherwise the record left by
+        the earlier submission. A concurrent duplicate blocks on the unique
+        index until the first transaction finishes, so it never reaches the
+        seat lock.
+        """
+        cls.objects.filter(user=user, key=key, created_at__lt=cls.expiry_cutoff()).delete()
+        try:
+            with transaction.atomic():
+                cls.objects.create(user=user, key=key)
+        except IntegrityError:
+            return cls.objects.select_related('booking').get(user=user, key=key)
+        return None
+
+
+class ArchivedTravelOption(models.Model):
+    """A departed TravelOption moved out of the hot table by ``archive_past_travel``."""
+    id = models.UUIDField(primary_key=True, editable=False)
+    travel_id = models.CharField(max_length=20, null=True, blank=True)
+    type = models.CharField(max_length=10, choices=TravelOption.TYPE_CHOICES)
+    source = models.CharField(max_length=100)
+    destination = models.CharField(max_length=100)
+    date_time = models.DateTimeField()
+    price = models.DecimalField(max_digits=8, decimal_places=2)
+    available_seats = models.PositiveIntegerField()
+    total_seats = models.PositiveIntegerField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['date_time']
+
+    def __str__(self):
+        return f"{self.travel_id}: {self.type} {self.source} → {self.destination} (archived)"
+
+
+class ArchivedBooking(models.Model):
+    """A Booking for an archived departure; keeps the same primary key."""
+    STATUS_CHOICES = Booking.STATUS_CHOICES
+
+    id = models.UUIDField(primary_key=True, editable=False)
+    booking_id = models.CharField(max_length=20, null=True, blank=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    travel_option = models.ForeignKey(ArchivedTravelOption, on_delete=models.CASCADE, related_name='bookings')
+    number_of_seats = models.PositiveIntegerField()
+    total_price = models.DecimalField(max_digits=8, decimal_places=2)
+    booking_date = models.DateTimeField(db_index=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    departure_time = models.DateTimeField(null=True, blank=True)
+    travel_type = models.CharField(max_length=10, choices=TravelOption.TYPE_CHOICES, blank=True)
+    source = models.CharField(max_length=100, blank=True)
+    destination = models.CharField(max_length=100, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-booking_date']
+        indexes = [
+            models.Index(fields=['user', 'booking_date'], name='archived_booking_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"Booking {self.booking_id} - {self.user.username} (archived)"
+
+
+class OutboxEvent(models.Model):
+    """Booking change written in the same transaction as the change itself.
+
+    Consumers read events in ``id`` order through ``relay_events``; the row
+    copies what they need, so it outlives archiving of the booking.
+    """
+    TYPE_CHOICES = [
+        ('booking.confirmed', 'Booking confirmed'),
+        ('booking.cancelled', 'Booking cancelled'),
+    ]
+
+    event_type = models.CharField(max_length=50, choices=TYPE_CHOICES)
+    booking = models.UUIDField(db_index=True)
+    payload = models.JSONField()
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"#{self.pk} {self.event_type} {self.payload.get('booking_id')}"
+
+    @classmethod
+    def record(cls, event_type, booking, **extra):
+        travel = booking.travel_option
+        return cls.objects.create(event_type=event_type, booking=booking.pk, payload={
+            'booking_id': booking.booking_id,
+            'user_id': booking.user_id,
+            'travel_option': str(travel.pk),
+            'travel_id': travel.travel_id,
+            'type': travel.type,
+            'source': travel.source,
+            'destination': travel.destination,
+            'date_time': travel.date_time.isoformat(),
+            'number_of_seats': booking.number_of_seats,
+            'total_price': str(booking.total_price),
+            'status': booking.status,
+            **extra,
+        })
+
+
+class OutboxCheckpoint(models.Model):
+    """Last event a named consumer has been sent."""
+    consumer = models.CharField(max_length=100, primary_key=True)
+    last_event_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.consumer} @ {self.last_event_id}"
@@ -0,0 +1,69 @@
+import json
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Min
+from django.utils import timezone
+from .models import OutboxCheckpoint, OutboxEvent
+
+
+def pending_events(after, batch_size, gap_seconds=None):
+    """Up to ``batch_size`` events after id ``after`` that are safe to publish, in id order.
+
+    Ids are allocated when a transaction inserts its event, not when it commits,
+    so a missing id may belong to a booking that is still committing. Reading
+    stops before such a gap until the events after it are ``gap_seconds`` old;
+    by then the gap is a rolled-back transaction and is skipped.
+    """
+    gap_seconds = settings.OUTBOX_GAP_SECONDS if gap_seconds is None else gap_seconds
+    cutoff = timezone.now() - timedelta(seconds=gap_seconds)
+    events = []
+    expected = after + 1
+    for event in OutboxEvent.objects.filter(id__gt=after).order_by('id')[:batch_size]:
+        if event.id != expected and event.created_at > cutoff:
+            break
+        events.append(event)
+        expected = event.id + 1
+    return events
+
+
+def serialize(event):
+    return json.dumps({
+        'id': event.id,
+        'event_type': event.event_type,
+        'booking': str(event.booking),
+        'created_at': event.created_at.isoformat(),
+        'payload': event.payload,
+    }, separators=(',', ':'))
+
+
+def relay_batch(consumer, send, batch_size=None, gap_seconds=None):
+    """Pass the next batch for ``consumer`` to ``send(events)`` and advance its checkpoint.
+
+    ``send`` runs outside any transaction, so a slow consumer never holds a
+    database lock that bookings wait on. The checkpoint then moves only if it
+    still holds the position the batch was read from; if ``send`` raises, it
+    does not move and the batch is sent again (at-least-once delivery).
+    Returns the number of events sent.
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    checkpoint, _ = OutboxCheckpoint.objects.get_or_create(consumer=consumer)
+    events = pending_events(checkpoint.last_event_id, batch_size, gap_seconds)
+    if events:
+        send(events)
+        # A second relay for the same consumer may have moved it meanwhile; never move it back
+        OutboxCheckpoint.objects.filter(consumer=consumer, last_event_id=checkpoint.last_event_id).update(
+            last_event_id=events[-1].id, updated_at=timezone.now()
+        )
+    return len(events)
+
+
+def purge_events(days):
+    """Delete events older than ``days`` that every consumer has already been sent."""
+    passed = OutboxCheckpoint.objects.aggregate(last=Min('last_event_id'))['last']
+    if passed is None:
+        return 0
+    deleted, _ = OutboxEvent.objects.filter(
+        id__lte=passed,
+        created_at__lt=timezone.now() - timedelta(days=days)
+    ).delete()
+    return deleted
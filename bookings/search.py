@@ -0,0 +1,121 @@
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import TravelOption
+
+# Casefolded shorthand -> casefolded place name as stored on TravelOption. Places
+# are matched with icontains, so only shorthand that cannot be part of another
+# place name belongs here: "la" would stop matching Dallas and Atlanta.
+ALIASES = {
+    'nyc': 'new york',
+    'new york city': 'new york',
+    'washington d.c.': 'washington dc',
+    'philly': 'philadelphia',
+}
+
+
+def normalize_place(value):
+    """Trim, collapse inner whitespace, casefold and resolve aliases."""
+    value = ' '.join(value.split()).casefold()
+    return ALIASES.get(value, value)
+
+
+def search_key(type='', source='', destination='', date=None):
+    return type, source, destination, date.isoformat() if date else ''
+
+
+class SearchMemo:
+    """Bounded LRU of normalized search -> ordered TravelOption ids, each kept for ``ttl`` seconds.
+
+    Only ids are kept: the page being shown is always read fresh by primary key,
+    so seat counts and prices are current while the set of matches can lag by
+    up to ``ttl``. New and deleted travel options clear this process's memo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, ids):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + settings.SEARCH_MEMO_TTL, ids)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.SEARCH_MEMO_SIZE:
+                self._entries.popitem(last=False)
+
+
+search_memo = SearchMemo()
+
+
+def upcoming_travel_options(type='', source='', destination='', date=None):
+    """Upcoming departures matching the travel_list filters."""
+    travels = TravelOption.objects.filter(date_time__gt=timezone.now())
+    if type:
+        travels = travels.filter(type=type)
+    if source:
+        travels = travels.filter(source__icontains=source)
+    if destination:
+        travels = travels.filter(destination__icontains=destination)
+    if date:
+        travels = travels.filter(date_time__date=date)
+    return travels
+
+
+def search_ids(**filters):
+    """Ordered ids of the matching departures, from the memo when a fresh entry exists."""
+    key = search_key(**filters)
+    ids = search_memo.get(key)
+    if ids is None:
+        travels = upcoming_travel_options(**filters).order_by('date_time', 'id')
+        ids = tuple(travels.values_list('id', flat=True))
+        search_memo.set(key, ids)
+    return ids
+
+
+class SearchResults:
+    """Sequence over memoized ids that loads only the sliced page from the database."""
+
+    def __init__(self, ids):
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        ids = self.ids[index]
+        found = TravelOption.objects.in_bulk(ids)
+        # Rows deleted by another process since the ids were memoized are skipped
+        return [found[pk] for pk in ids if pk in found]
+
+
+@receiver(post_save, sender=TravelOption)
+def forget_searches_on_create(sender, instance, created, raw=False, **kwargs):
+    # Seat and price updates do not change which options match a search
+    if created and not raw:
+        search_memo.clear()
+
+
+@receiver(post_delete, sender=TravelOption)
+def forget_searches_on_delete(sender, instance, **kwargs):
+    search_memo.clear()
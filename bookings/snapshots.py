@@ -0,0 +1,157 @@
+import datetime
+import json
+import struct
+import zlib
+from django.apps import apps
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, transaction
+
+# A snapshot is MAGIC followed by frames: a 4-byte big-endian length, then a
+# zlib-compressed JSON object with up to chunk_size rows of one model, stored
+# column by column: {"model": "bookings.booking", "fields": [...], "columns": [[...], ...]}
+MAGIC = b'TBSNAP\x01\n'
+FRAME_HEADER = struct.Struct('>I')
+# Parents before children, so rows can be inserted in file order
+SNAPSHOT_MODELS = [
+    'auth.user',
+    'accounts.profile',
+    'bookings.traveloption',
+    'bookings.booking',
+    'bookings.archivedtraveloption',
+    'bookings.archivedbooking',
+]
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class SnapshotEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder rounds times to milliseconds; snapshots must round-trip exactly
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def snapshot_models():
+    return [apps.get_model(label) for label in SNAPSHOT_MODELS]
+
+
+def write_snapshot(stream, chunk_size=5000, level=6, using='default'):
+    """Write every snapshot model to ``stream``; returns {model label: rows written}."""
+    stream.write(MAGIC)
+    counts = {}
+    for model in snapshot_models():
+        fields = [field.attname for field in model._meta.concrete_fields]
+        rows = model._base_manager.using(using).order_by('pk').values_list(*fields)
+        count = 0
+        chunk = []
+        for row in rows.iterator(chunk_size=chunk_size):
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                _write_frame(stream, model, fields, chunk, level)
+                count += len(chunk)
+                chunk = []
+        if chunk:
+            _write_frame(stream, model, fields, chunk, level)
+            count += len(chunk)
+        counts[model._meta.label_lower] = count
+    return counts
+
+
+def _write_frame(stream, model, fields, rows, level):
+    payload = json.dumps({
+        'model': model._meta.label_lower,
+        'fields': fields,
+        'columns': [list(column) for column in zip(*rows)],
+    }, cls=SnapshotEncoder, separators=(',', ':')).encode()
+    compressed = zlib.compress(payload, level)
+    stream.write(FRAME_HEADER.pack(len(compressed)))
+    stream.write(compressed)
+
+
+def read_frames(stream):
+    """Yield decoded frames one at a time."""
+    if stream.read(len(MAGIC)) != MAGIC:
+        raise SnapshotError('Not a booking snapshot file')
+    while True:
+        header = stream.read(FRAME_HEADER.size)
+        if not header:
+            return
+        if len(header) < FRAME_HEADER.size:
+            raise SnapshotError('Snapshot file is truncated')
+        (length,) = FRAME_HEADER.unpack(header)
+        data = stream.read(length)
+        if len(data) < length:
+            raise SnapshotError('Snapshot file is truncated')
+        yield json.loads(zlib.decompress(data))
+
+
+def restore_snapshot(stream, flush=False, using='default'):
+    """Load a snapshot with executemany() INSERTs; returns {model label: rows loaded}.
+
+    Foreign key checks are disabled (MySQL) or deferred (PostgreSQL, SQLite)
+    while loading and verified once at the end, like ``loaddata``.
+    """
+    connection = connections[using]
+    models = snapshot_models()
+    counts = dict.fromkeys(SNAPSHOT_MODELS, 0)
+
+    with transaction.atomic(using=using):
+        if flush:
+            for model in reversed(models):
+                model._base_manager.using(using).all().delete()
+        else:
+            occupied = [model._meta.label_lower for model in models
+                        if model._base_manager.using(using).exists()]
+            if occupied:
+                raise SnapshotError(f"Tables already hold data: {', '.join(occupied)} (use --flush)")
+
+        with connection.constraint_checks_disabled():
+            inserters = {}
+            for frame in read_frames(stream):
+                label = frame['model']
+                if label not in counts:
+                    raise SnapshotError(f'Unexpected model in snapshot: {label}')
+                key = (label, tuple(frame['fields']))
+                if key not in inserters:
+                    inserters[key] = _inserter(connection, apps.get_model(label), frame['fields'])
+                sql, converters = inserters[key]
+                rows = [
+                    [convert(value) for convert, value in zip(converters, row)]
+                    for row in zip(*frame['columns'])
+                ]
+                with connection.cursor() as cursor:
+                    cursor.executemany(sql, rows)
+                counts[label] += len(rows)
+
+        connection.check_constraints(table_names=[model._meta.db_table for model in models])
+        # Explicit primary keys leave PostgreSQL/Oracle sequences behind
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                cursor.execute(sql)
+    return counts
+
+
+def _inserter(connection, model, attnames):
+    fields = {field.attname: field for field in model._meta.concrete_fields}
+    unknown = [name for name in attnames if name not in fields]
+    if unknown:
+        raise SnapshotError(f"{model._meta.label_lower} has no field(s) {', '.join(unknown)}; "
+                            f"was the snapshot taken before a migration?")
+    quote = connection.ops.quote_name
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote(model._meta.db_table),
+        ', '.join(quote(fields[name].column) for name in attnames),
+        ', '.join(['%s'] * len(attnames)),
+    )
+
+    def converter(field):
+        # JSON gives back strings for dates, decimals and UUIDs
+        def convert(value):
+            return field.get_db_prep_save(field.to_python(value), connection)
+        return convert
+
+    return sql, [converter(fields[name]) for name in attnames]
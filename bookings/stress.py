@@ -0,0 +1,152 @@
+import random
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.contrib.messages import constants, get_messages
+from django.db import connection, IntegrityError, OperationalError
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from .models import ArchivedBooking, ArchivedTravelOption, Booking, OutboxEvent, Task, TravelOption
+
+# Errors a worker retries: lock timeouts and deadlocks, and ID collisions that
+# got past save_with_code
+RETRYABLE = (OperationalError, IntegrityError)
+
+
+def check_invariants(travel_options=None):
+    """Return a list of violated booking invariants (empty when the data is consistent).
+
+    ``travel_options`` limits the seat check to those rows; ID uniqueness is
+    always checked across live and archived tables.
+    """
+    problems = []
+    options = TravelOption.objects.all()
+    if travel_options is not None:
+        options = options.filter(pk__in=travel_options)
+    confirmed = Coalesce(Sum('booking__number_of_seats', filter=Q(booking__status='CONFIRMED')), 0)
+    mismatched = (options.annotate(confirmed=confirmed)
+                  .exclude(total_seats=F('confirmed') + F('available_seats'))
+                  .values_list('travel_id', 'confirmed', 'available_seats', 'total_seats'))
+    for travel_id, seats, available, total in mismatched:
+        problems.append(f'{travel_id}: {seats} confirmed + {available} available != {total} total seats')
+
+    for model, field in [(Booking, 'booking_id'), (ArchivedBooking, 'booking_id'),
+                         (TravelOption, 'travel_id'), (ArchivedTravelOption, 'travel_id')]:
+        duplicates = (model.objects.exclude(**{f'{field}__isnull': True}).values(field)
+                      .annotate(n=Count('pk')).filter(n__gt=1).values_list(field, 'n'))
+        for value, n in duplicates:
+            problems.append(f'{model._meta.verbose_name} {field} {value} used {n} times')
+    for model, archived, field in [(Booking, ArchivedBooking, 'booking_id'),
+                                   (TravelOption, ArchivedTravelOption, 'travel_id')]:
+        both = model.objects.filter(**{f'{field}__in': archived.objects.values(field)})
+        for value in both.values_list(field, flat=True):
+            problems.append(f'{field} {value} is both live and archived')
+    return problems
+
+
+def create_fixtures(prefix, users, travel_options, seats):
+    """Create the users and upcoming travel options a stress run books against."""
+    User.objects.bulk_create([User(username=f'{prefix}-{i}') for i in range(users)])
+    departure = timezone.now() + timedelta(days=30)
+    travels = [
+        TravelOption.objects.create(
+            type=('FLIGHT', 'TRAIN', 'BUS')[i % 3],
+            source='Stress City',
+            destination=f'Load Town {i}',
+            date_time=departure + timedelta(hours=i),
+            price=Decimal('10.00'),
+            available_seats=seats,
+            total_seats=seats,
+        )
+        for i in range(travel_options)
+    ]
+    user_ids = list(User.objects.filter(username__startswith=f'{prefix}-').values_list('pk', flat=True))
+    return user_ids, [str(travel.pk) for travel in travels]
+
+
+def delete_fixtures(user_ids, travel_ids):
+    booking_ids = [str(pk) for pk in Booking.objects.filter(travel_option__in=travel_ids).values_list('pk', flat=True)]
+    Task.objects.filter(Q(payload__booking_id__in=booking_ids) | Q(payload__travel_option_id__in=travel_ids)).delete()
+    OutboxEvent.objects.filter(booking__in=booking_ids).delete()
+    TravelOption.objects.filter(pk__in=travel_ids).delete()
+    User.objects.filter(pk__in=user_ids).delete()
+
+
+def run_workers(threads, operations, user_ids, travel_ids, cancel_ratio=0.3, max_seats=3, retries=5, seed=None):
+    """Run ``operations`` book/cancel requests spread over ``threads`` clients.
+
+    Returns a Counter of outcomes: booked, sold_out, cancelled, cancel_refused,
+    nothing_to_cancel, retries, failed and ``error:<class>`` per exception caught.
+    """
+    totals = Counter()
+    lock = threading.Lock()
+    share, extra = divmod(operations, threads)
+
+    def work(n, seed):
+        rng = random.Random(seed)
+        counts = Counter()
+        clients = {}
+        try:
+            for _ in range(n):
+                _operate(rng, counts, clients, user_ids, travel_ids, cancel_ratio, max_seats, retries)
+        finally:
+            connection.close()
+            with lock:
+                totals.update(counts)
+
+    rng = random.Random(seed)
+    # Booking only goes through the views, so per-user rate limits would dominate
+    with override_settings(ALLOWED_HOSTS=['testserver'], RATELIMIT_ENABLED=False):
+        workers = [threading.Thread(target=work, args=(share + (i < extra), rng.random()))
+                   for i in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    return totals
+
+
+def _operate(rng, counts, clients, user_ids, travel_ids, cancel_ratio, max_seats, retries):
+    user_id = rng.choice(user_ids)
+    cancel = rng.random() < cancel_ratio
+    for attempt in range(retries + 1):
+        try:
+            client = clients.get(user_id)
+            if client is None:
+                client = Client()
+                client.force_login(User.objects.get(pk=user_id))
+                clients[user_id] = client
+            if cancel:
+                # Several clients share each user, so two may cancel the same booking
+                booking = (Booking.objects.filter(user=user_id, status='CONFIRMED', travel_option__in=travel_ids)
+                           .values_list('pk', flat=True).order_by('?').first())
+                if booking is None:
+                    counts['nothing_to_cancel'] += 1
+                    return
+                response = client.post(reverse('bookings:cancel_booking', args=[booking]))
+                counts['cancelled' if _succeeded(response) else 'cancel_refused'] += 1
+            else:
+                travel = rng.choice(travel_ids)
+                response = client.post(reverse('bookings:book_travel', args=[travel]),
+                                       {'number_of_seats': rng.randint(1, max_seats)})
+                counts['booked' if _succeeded(response) else 'sold_out'] += 1
+            return
+        except RETRYABLE as exc:
+            connection.close()
+            counts[f'error:{type(exc).__name__}'] += 1
+            if attempt == retries:
+                counts['failed'] += 1
+                return
+            counts['retries'] += 1
+            time.sleep(rng.uniform(0, 0.01 * 2 ** attempt))
+
+
+def _succeeded(response):
+    return any(message.level == constants.SUCCESS for message in get_messages(response.wsgi_request))
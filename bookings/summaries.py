@@ -0,0 +1,30 @@
+from django.db import transaction
+from django.db.models import F, OuterRef, Q, Subquery
+from django.utils import timezone
+from .models import SUMMARY_FIELDS, Booking, TravelOption
+
+
+def stale_bookings():
+    """Bookings whose summary columns no longer match their travel option.
+
+    TravelOption.save() keeps them in step; this catches QuerySet.update(),
+    raw SQL and rows restored from older snapshots.
+    """
+    stale = Q(departure_time__isnull=True)
+    for field, source in SUMMARY_FIELDS.items():
+        stale |= ~Q(**{field: F(f'travel_option__{source}')})
+    return Booking.objects.filter(stale)
+
+
+def sync_chunk(chunk_size):
+    """Rewrite the summary columns of up to ``chunk_size`` stale bookings in one short
+    transaction. Returns the number of bookings fixed; 0 once nothing is left.
+    """
+    with transaction.atomic():
+        ids = list(stale_bookings().order_by().values_list('id', flat=True)[:chunk_size])
+        if not ids:
+            return 0
+        travel = TravelOption.objects.filter(pk=OuterRef('travel_option_id'))
+        return Booking.objects.filter(id__in=ids).update(updated_at=timezone.now(), **{
+            field: Subquery(travel.values(source)[:1]) for field, source in SUMMARY_FIELDS.items()
+        })
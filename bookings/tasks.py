@@ -0,0 +1,234 @@
+import logging
+import traceback
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection, transaction, IntegrityError
+from django.db.models import Q
+from django.utils import timezone
+from .models import Task, Booking
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+class PartialFailure(Exception):
+    """Raised by a batch handler when only some payloads failed.
+
+    ``failed`` holds their positions in the payload list; those tasks are
+    retried and the rest are marked done, so finished work is not repeated.
+    """
+
+    def __init__(self, failed, message=None):
+        super().__init__(message or f'{len(failed)} payload(s) failed')
+        self.failed = set(failed)
+
+
+def task(name, batch=False, max_attempts=None):
+    """Register a side-effect handler with the task queue.
+
+    Plain handlers are called with one payload dict. ``batch=True``
+    handlers receive every payload of that name claimed in one worker
+    pass, so they can share a connection (SMTP, HTTP) across tasks.
+    """
+    def decorator(func):
+        _registry[name] = {
+            'func': func,
+            'batch': batch,
+            'max_attempts': max_attempts or settings.TASK_MAX_ATTEMPTS,
+        }
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, key=None, delay=0):
+    """Queue a task. Re-enqueueing an existing idempotency key is a no-op."""
+    if name not in _registry:
+        raise ValueError(f'Unknown task: {name}')
+
+    fields = {
+        'name': name,
+        'payload': payload or {},
+        'max_attempts': _registry[name]['max_attempts'],
+        'run_at': timezone.now() + timedelta(seconds=delay),
+    }
+    if key is None:
+        queued = Task.objects.create(**fields)
+    else:
+        try:
+            with transaction.atomic():
+                queued, _ = Task.objects.get_or_create(idempotency_key=key, defaults=fields)
+        except IntegrityError:
+            queued = Task.objects.get(idempotency_key=key)
+
+    if settings.TASK_QUEUE_EAGER and queued.status == 'PENDING':
+        run_tasks([queued])
+    return queued
+
+
+def enqueue_on_commit(name, payload=None, key=None, delay=0):
+    """Queue a task only once the surrounding transaction has committed."""
+    transaction.on_commit(lambda: enqueue(name, payload, key=key, delay=delay))
+
+
+def claim_tasks(batch_size=None):
+    batch_size = batch_size or settings.TASK_BATCH_SIZE
+    now = timezone.now()
+    due = Q(status='PENDING', run_at__lte=now) | Q(status='RUNNING', locked_until__lt=now)
+
+    with transaction.atomic():
+        tasks = list(
+            Task.objects.select_for_update(
+                skip_locked=connection.features.has_select_for_update_skip_locked
+            ).filter(due).order_by('run_at', 'id')[:batch_size]
+        )
+        if tasks:
+            Task.objects.filter(pk__in=[t.pk for t in tasks]).update(
+                status='RUNNING',
+                locked_until=now + timedelta(seconds=settings.TASK_LEASE_SECONDS),
+                updated_at=now
+            )
+    return tasks
+
+
+def run_tasks(tasks):
+    """Execute claimed tasks, grouping batch handlers. Returns (done, failed)."""
+    groups = {}
+    for queued in tasks:
+        groups.setdefault(queued.name, []).append(queued)
+
+    done = failed = 0
+    for name, group in groups.items():
+        handler = _registry.get(name)
+        if handler is None:
+            for queued in group:
+                _finish(queued, error=f'Unknown task: {name}', retry=False)
+            failed += len(group)
+            continue
+
+        if handler['batch']:
+            calls = [(group, [queued.payload for queued in group])]
+        else:
+            calls = [([queued], queued.payload) for queued in group]
+
+        for members, argument in calls:
+            try:
+                handler['func'](argument)
+            except PartialFailure as exc:
+                logger.warning('Task %s failed for %d of %d payloads', name, len(exc.failed), len(members))
+                error = traceback.format_exc()
+                for index, queued in enumerate(members):
+                    if index in exc.failed:
+                        _finish(queued, error=error)
+                        failed += 1
+                    else:
+                        _finish(queued)
+                        done += 1
+            except Exception:
+                logger.exception('Task %s failed', name)
+                error = traceback.format_exc()
+                for queued in members:
+                    _finish(queued, error=error)
+                failed += len(members)
+            else:
+                for queued in members:
+                    _finish(queued)
+                done += len(members)
+    return done, failed
+
+
+def _finish(queued, error=None, retry=True):
+    queued.attempts += 1
+    queued.locked_until = None
+    if error is None:
+        queued.status = 'DONE'
+        queued.last_error = ''
+    elif retry and queued.attempts < queued.max_attempts:
+        queued.status = 'PENDING'
+        queued.last_error = error
+        backoff = min(settings.TASK_RETRY_BACKOFF * 2 ** (queued.attempts - 1), 3600)
+        queued.run_at = timezone.now() + timedelta(seconds=backoff)
+    else:
+        queued.status = 'FAILED'
+        queued.last_error = error
+    queued.save(update_fields=['status', 'attempts', 'locked_until', 'last_error', 'run_at', 'updated_at'])
+
+
+def _send_booking_emails(payloads, subject, body):
+    """Send one email per payload over a shared connection, retrying only the sends that failed."""
+    ids = [payload['booking_id'] for payload in payloads]
+    bookings = {
+        str(booking.pk): booking
+        for booking in Booking.objects.filter(pk__in=ids).select_related('user', 'travel_option')
+    }
+    failed = []
+    with get_connection() as mail_connection:
+        for index, payload in enumerate(payloads):
+            booking = bookings.get(payload['booking_id'])
+            if booking is None or not booking.user.email:
+                continue
+            message = EmailMessage(
+                subject.format(booking=booking),
+                body.format(booking=booking, travel=booking.travel_option),
+                settings.DEFAULT_FROM_EMAIL,
+                [booking.user.email],
+                connection=mail_connection,
+            )
+            try:
+                message.send()
+            except Exception:
+                logger.exception('Email for booking %s failed', booking.booking_id)
+                failed.append(index)
+    if failed:
+        raise PartialFailure(failed)
+
+
+@task('booking.confirmation_email', batch=True)
+def send_confirmation_emails(payloads):
+    _send_booking_emails(
+        payloads,
+        'Booking confirmed: {booking.booking_id}',
+        'Your booking {booking.booking_id} for {travel.source} → {travel.destination} '
+        'on {travel.date_time:%b %d, %Y %H:%M} is confirmed ({booking.number_of_seats} seat(s), '
+        'total ${booking.total_price}).'
+    )
+
+
+@task('booking.cancellation_email', batch=True)
+def send_cancellation_emails(payloads):
+    _send_booking_emails(
+        payloads,
+        'Booking cancelled: {booking.booking_id}',
+        'Your booking {booking.booking_id} for {travel.source} → {travel.destination} '
+        'on {travel.date_time:%b %d, %Y %H:%M} has been cancelled.'
+    )
+
+
+@task('analytics.booking_event', batch=True)
+def record_booking_events(payloads):
+    for payload in payloads:
+        logger.info('booking event %(event)s booking=%(booking_id)s', payload)
+
+
+@task('ticket.render', batch=True)
+def render_booking_tickets(payloads):
+    from .tickets import render_tickets
+    ids = [payload['booking_id'] for payload in payloads]
+    render_tickets(Booking.objects.filter(pk__in=ids).select_related('user', 'travel_option'))
+
+
+def enqueue_promoted(entries):
+    """Queue the confirmation, ticket and analytics tasks for bookings made from the waitlist."""
+    for entry in entries:
+        booking_id = str(entry.booking_id)
+        enqueue('booking.confirmation_email', {'booking_id': booking_id}, key=f'confirmation:{booking_id}')
+        enqueue('ticket.render', {'booking_id': booking_id}, key=f'ticket:confirmed:{booking_id}')
+        enqueue('analytics.booking_event', {'event': 'promoted', 'booking_id': booking_id},
+                key=f'analytics:promoted:{booking_id}')
+
+
+@task('waitlist.promote')
+def promote_waitlist_task(payload):
+    from .waitlist import promote_waitlist
+    enqueue_promoted(promote_waitlist(payload['travel_option_id']))
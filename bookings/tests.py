@@ -1,9 +1,43 @@
-from django.test import TestCase, Client
+from django.test import TestCase, TransactionTestCase, Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core import mail
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import connection, OperationalError
+from django.http import HttpResponse
 from django.urls import reverse
 from django.utils import timezone
 from decimal import Decimal
-from .models import TravelOption, Booking
+from unittest import mock
+from io import BytesIO, StringIO
+import csv
+import gzip
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+from travel_booking.db_routers import PrimaryReplicaRouter, ReplicaRoutingMiddleware
+from travel_booking.ratelimit import client_ip
+from . import views
+from .forms import BookingForm, FilterForm
+from .archive import archive_chunk
+from .availability import availability_index
+from .management.commands.vendor_assets import VENDOR_ASSETS
+from .models import (TravelOption, Booking, WaitlistEntry, Task, IdempotencyKey, ArchivedBooking,
+                     OutboxEvent, OutboxCheckpoint)
+from .outbox import pending_events, purge_events, relay_batch
+from .history import upcoming_bookings
+from .search import search_ids, search_memo
+from .snapshots import SnapshotError, restore_snapshot, write_snapshot
+from .stress import check_invariants
+from .tasks import task, enqueue, claim_tasks, run_tasks, _registry as task_registry
+from .tickets import get_ticket, ticket_data, render_ticket_file, render_tickets
+from .waitlist import promote_waitlist
 
 
 class BookingsTestCase(TestCase):
@@ -182,3 +216,1361 @@ class BookingsTestCase(TestCase):
         # Check final seat count
         self.travel_option.refresh_from_db()
         self.assertEqual(self.travel_option.available_seats, 0)
+
+
+class WaitlistTestCase(TestCase):
+    def setUp(self):
+        self.travel_option = TravelOption.objects.create(
+            type='TRAIN',
+            source='Chicago',
+            destination='Denver',
+            date_time=timezone.now() + timezone.timedelta(days=5),
+            price=Decimal('89.99'),
+            available_seats=0,
+            total_seats=3
+        )
+        self.holder = User.objects.create_user(username='holder', password='testpass123')
+        self.booking = Booking.objects.create(
+            user=self.holder,
+            travel_option=self.travel_option,
+            number_of_seats=3
+        )
+        self.first = User.objects.create_user(username='first', password='testpass123')
+        self.second = User.objects.create_user(username='second', password='testpass123')
+
+    def test_sold_out_travel_is_listed_with_waitlist(self):
+        """Test that sold-out departures are listed and offer the waitlist."""
+        self.client.force_login(self.first)
+        response = self.client.get(reverse('bookings:travel_list'))
+        self.assertContains(response, reverse('bookings:join_waitlist', args=[self.travel_option.id]))
+
+    def test_join_waitlist(self):
+        """Test joining the waitlist for a sold-out departure."""
+        self.client.force_login(self.first)
+        response = self.client.post(
+            reverse('bookings:join_waitlist', args=[self.travel_option.id]),
+            {'number_of_seats': 2}
+        )
+        self.assertEqual(response.status_code, 302)
+        entry = WaitlistEntry.objects.get(user=self.first)
+        self.assertEqual(entry.status, 'WAITING')
+        self.assertEqual(entry.number_of_seats, 2)
+
+    def test_join_waitlist_race_is_not_an_error(self):
+        """Test that a double submit that slips past the duplicate check is reported, not a 500."""
+        WaitlistEntry.objects.create(user=self.first, travel_option=self.travel_option, number_of_seats=1)
+        self.client.force_login(self.first)
+        with mock.patch.object(views.WaitlistEntry.objects, 'filter', return_value=WaitlistEntry.objects.none()):
+            response = self.client.post(
+                reverse('bookings:join_waitlist', args=[self.travel_option.id]),
+                {'number_of_seats': 2}, follow=True
+            )
+        self.assertContains(response, 'already on the waitlist')
+        self.assertEqual(WaitlistEntry.objects.filter(user=self.first).count(), 1)
+
+    def test_cancellation_promotes_in_fifo_order(self):
+        """Test that freed seats are booked for waiting users in order."""
+        first = WaitlistEntry.objects.create(user=self.first, travel_option=self.travel_option, number_of_seats=2)
+        second = WaitlistEntry.objects.create(user=self.second, travel_option=self.travel_option, number_of_seats=2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(self.booking.cancel())
+        run_tasks(claim_tasks())
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.status, 'PROMOTED')
+        self.assertEqual(first.booking.number_of_seats, 2)
+        self.assertEqual(first.booking.user, self.first)
+        # Only one seat left, so the second request keeps its place in the queue
+        self.assertEqual(second.status, 'WAITING')
+
+        self.travel_option.refresh_from_db()
+        self.assertEqual(self.travel_option.available_seats, 1)
+
+    def test_freed_seats_never_reach_book_travel_before_the_queue(self):
+        """Test that promotion happens in the cancel transaction, before any worker runs."""
+        entry = WaitlistEntry.objects.create(user=self.first, travel_option=self.travel_option, number_of_seats=3)
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.assertTrue(self.booking.cancel())
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, 'PROMOTED')
+        self.travel_option.refresh_from_db()
+        self.assertEqual(self.travel_option.available_seats, 0)
+
+        self.client.force_login(self.second)
+        response = self.client.post(reverse('bookings:book_travel', args=[self.travel_option.id]),
+                                    {'number_of_seats': 1})
+        self.assertFalse(Booking.objects.filter(user=self.second).exists())
+        self.assertEqual(response.status_code, 302)
+
+        for callback in callbacks:
+            callback()
+        self.assertIn('booking.confirmation_email', Task.objects.values_list('name', flat=True))
+
+    def test_departed_entries_are_hidden_and_expired(self):
+        """Test that waiting entries for departed journeys leave My Bookings and are expired by the sweep."""
+        entry = WaitlistEntry.objects.create(user=self.first, travel_option=self.travel_option, number_of_seats=1)
+        TravelOption.objects.filter(pk=self.travel_option.pk).update(
+            date_time=timezone.now() - timezone.timedelta(hours=1), updated_at=timezone.now()
+        )
+        self.client.force_login(self.first)
+        self.assertEqual(list(self.client.get(reverse('bookings:my_bookings')).context['waitlist_entries']), [])
+
+        out = StringIO()
+        call_command('promote_waitlist', stdout=out)
+        self.assertIn('Expired 1 waitlist entries', out.getvalue())
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, 'EXPIRED')
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), TICKET_RENDER_WORKERS=1)
+class TaskQueueTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', email='test@example.com', password='testpass123')
+        self.travel_option = TravelOption.objects.create(
+            type='BUS',
+            source='Miami',
+            destination='Orlando',
+            date_time=timezone.now() + timezone.timedelta(days=3),
+            price=Decimal('25.99'),
+            available_seats=10,
+            total_seats=10
+        )
+
+    def test_booking_enqueues_side_effects_after_commit(self):
+        """Test that booking defers emails to the worker until commit."""
+        self.client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('bookings:book_travel', args=[self.travel_option.id]),
+                {'number_of_seats': 2}
+            )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            set(Task.objects.values_list('name', flat=True)),
+            {'booking.confirmation_email', 'ticket.render', 'analytics.booking_event'}
+        )
+        self.assertEqual(len(mail.outbox), 0)
+
+        done, failed = run_tasks(claim_tasks())
+        self.assertEqual((done, failed), (3, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('Booking confirmed', mail.outbox[0].subject)
+
+    def test_idempotency_key_deduplicates(self):
+        """Test that re-enqueueing the same key does not duplicate work."""
+        first = enqueue('analytics.booking_event', {'event': 'booked', 'booking_id': 'x'}, key='analytics:x')
+        second = enqueue('analytics.booking_event', {'event': 'booked', 'booking_id': 'x'}, key='analytics:x')
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_failed_task_is_retried_then_marked_failed(self):
+        """Test retry with backoff and the max-attempts cut-off."""
+        @task('tests.always_fails', max_attempts=2)
+        def always_fails(payload):
+            raise RuntimeError('boom')
+        self.addCleanup(task_registry.pop, 'tests.always_fails', None)
+
+        queued = enqueue('tests.always_fails')
+        run_tasks(claim_tasks())
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'PENDING')
+        self.assertGreater(queued.run_at, timezone.now())
+
+        Task.objects.filter(pk=queued.pk).update(run_at=timezone.now())
+        run_tasks(claim_tasks())
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'FAILED')
+        self.assertEqual(queued.attempts, 2)
+        self.assertIn('boom', queued.last_error)
+
+    def test_failed_email_in_batch_retries_only_that_email(self):
+        """Test that one failed send in a batch does not resend emails that went out."""
+        bookings = [Booking.objects.create(user=self.user, travel_option=self.travel_option) for _ in range(3)]
+        queued = [enqueue('booking.confirmation_email', {'booking_id': str(booking.pk)}) for booking in bookings]
+        send = mail.EmailMessage.send
+        failing = f'Booking confirmed: {bookings[1].booking_id}'
+
+        def flaky_send(message, *args, **kwargs):
+            if message.subject == failing:
+                raise ConnectionError('SMTP hiccup')
+            return send(message, *args, **kwargs)
+
+        with mock.patch.object(mail.EmailMessage, 'send', flaky_send):
+            self.assertEqual(run_tasks(claim_tasks()), (2, 1))
+        self.assertEqual(len(mail.outbox), 2)
+        statuses = {task.pk: task.status for task in Task.objects.all()}
+        self.assertEqual([statuses[task.pk] for task in queued], ['DONE', 'PENDING', 'DONE'])
+
+        Task.objects.filter(pk=queued[1].pk).update(run_at=timezone.now())
+        self.assertEqual(run_tasks(claim_tasks()), (1, 0))
+        self.assertEqual([message.subject for message in mail.outbox[2:]], [failing])
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), TICKET_RENDER_WORKERS=1)
+class TicketTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.travel_option = TravelOption.objects.create(
+            type='FLIGHT',
+            source='Boston',
+            destination='Denver',
+            date_time=timezone.now() + timezone.timedelta(days=12),
+            price=Decimal('249.99'),
+            available_seats=10,
+            total_seats=10
+        )
+        self.booking = Booking.objects.create(user=self.user, travel_option=self.travel_option, number_of_seats=1)
+
+    def test_render_is_cached_per_status_version(self):
+        """Test that tickets are cached and re-keyed when the status changes."""
+        confirmed = ticket_data(self.booking)
+        self.assertEqual(len(render_tickets([self.booking])), 1)
+        self.assertTrue(os.path.exists(confirmed['path']))
+        self.assertEqual(render_tickets([self.booking]), [])
+
+        self.booking.cancel()
+        cancelled = ticket_data(self.booking)
+        self.assertNotEqual(confirmed['version'], cancelled['version'])
+        render_tickets([self.booking])
+        self.assertTrue(os.path.exists(cancelled['path']))
+        self.assertFalse(os.path.exists(confirmed['path']))
+
+    def test_late_render_of_old_data_keeps_newer_ticket(self):
+        """Test that a render task running on stale data does not delete the current ticket."""
+        stale = ticket_data(self.booking)
+        self.booking.cancel()
+        current = ticket_data(self.booking)
+        render_ticket_file(current)
+        render_ticket_file(stale)
+        self.assertTrue(os.path.exists(current['path']))
+
+        os.remove(stale['path'])
+        os.remove(current['path'])
+        data, ticket = get_ticket(self.booking)
+        with ticket:
+            self.assertTrue(ticket.read().startswith(b'%PDF'))
+        self.assertEqual(data['version'], current['version'])
+
+    def test_threads_rendering_one_ticket_do_not_collide(self):
+        """Test that concurrent renders of the same ticket in one process all succeed."""
+        data = ticket_data(self.booking)
+        errors = []
+
+        def render():
+            try:
+                render_ticket_file(data)
+            except Exception as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=render) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        with open(data['path'], 'rb') as ticket:
+            self.assertTrue(ticket.read().startswith(b'%PDF'))
+        self.assertEqual(list(Path(data['path']).parent.glob('*.tmp')), [])
+
+    def test_download_ticket_with_etag(self):
+        """Test ticket download and conditional revalidation."""
+        self.client.force_login(self.user)
+        url = reverse('bookings:download_ticket', args=[self.booking.id])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_download_ticket_requires_owner(self):
+        """Test that users cannot download other users' tickets."""
+        other = User.objects.create_user(username='other', password='testpass123')
+        self.client.force_login(other)
+        response = self.client.get(reverse('bookings:download_ticket', args=[self.booking.id]))
+        self.assertEqual(response.status_code, 404)
+
+
+class IdempotentBookingTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.travel_option = TravelOption.objects.create(
+            type='TRAIN',
+            source='New York',
+            destination='Washington DC',
+            date_time=timezone.now() + timezone.timedelta(days=3),
+            price=Decimal('65.99'),
+            available_seats=5,
+            total_seats=5
+        )
+        self.client.force_login(self.user)
+        self.url = reverse('bookings:book_travel', args=[self.travel_option.id])
+        cache.clear()
+
+    def test_booking_form_carries_token(self):
+        """Test that the booking page embeds a fresh idempotency token."""
+        response = self.client.get(self.url)
+        self.assertContains(response, 'name="idempotency_key"')
+
+    def test_double_submit_books_once(self):
+        """Test that resubmitting the same token replays the first booking."""
+        data = {'number_of_seats': 2, 'idempotency_key': 'double-submit'}
+        first = self.client.post(self.url, data)
+        second = self.client.post(self.url, data)
+        self.assertEqual(first.status_code, 302)
+        self.assertEqual(second.status_code, 302)
+
+        self.assertEqual(Booking.objects.filter(user=self.user).count(), 1)
+        self.travel_option.refresh_from_db()
+        self.assertEqual(self.travel_option.available_seats, 3)
+        self.assertEqual(IdempotencyKey.objects.get(key='double-submit').booking, Booking.objects.get())
+
+    def test_header_key_and_expiry(self):
+        """Test the Idempotency-Key header and that expired keys stop replaying."""
+        self.client.post(self.url, {'number_of_seats': 1}, HTTP_IDEMPOTENCY_KEY='retry-1')
+        self.client.post(self.url, {'number_of_seats': 1}, HTTP_IDEMPOTENCY_KEY='retry-1')
+        self.assertEqual(Booking.objects.count(), 1)
+
+        IdempotencyKey.objects.update(created_at=timezone.now() - timezone.timedelta(days=2))
+        self.client.post(self.url, {'number_of_seats': 1}, HTTP_IDEMPOTENCY_KEY='retry-1')
+        self.assertEqual(Booking.objects.count(), 2)
+
+    def test_failed_attempt_releases_key(self):
+        """Test that a booking rejected under the seat lock does not pin its token."""
+        # Skip the optimistic form check so the request reaches the locked re-check
+        with mock.patch.object(BookingForm, 'clean_number_of_seats', lambda form: form.cleaned_data['number_of_seats']):
+            response = self.client.post(self.url, {'number_of_seats': 6, 'idempotency_key': 'too-many'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(IdempotencyKey.objects.filter(key='too-many').exists())
+
+        response = self.client.post(self.url, {'number_of_seats': 2, 'idempotency_key': 'too-many'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Booking.objects.get().number_of_seats, 2)
+
+
+@override_settings(RATELIMITS={'travel_list': '3/m', 'book_travel': '1/m'})
+class RateLimitTestCase(TestCase):
+    def setUp(self):
+        caches['ratelimit'].clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.travel_option = TravelOption.objects.create(
+            type='BUS',
+            source='Dallas',
+            destination='Austin',
+            date_time=timezone.now() + timezone.timedelta(days=7),
+            price=Decimal('29.99'),
+            available_seats=20,
+            total_seats=20
+        )
+
+    def test_travel_list_is_limited_per_ip(self):
+        """Test that anonymous search traffic is throttled per IP."""
+        url = reverse('bookings:travel_list')
+        for _ in range(3):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+        other_ip = self.client.get(url, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(other_ip.status_code, 200)
+
+    @override_settings(RATELIMIT_IP_HEADER='HTTP_X_FORWARDED_FOR', RATELIMIT_TRUSTED_PROXIES=1)
+    def test_forged_forwarded_for_does_not_reset_budget(self):
+        """Test that client-written X-Forwarded-For entries do not give a fresh budget."""
+        url = reverse('bookings:travel_list')
+        statuses = [
+            self.client.get(url, HTTP_X_FORWARDED_FOR=f'198.51.100.{i}, 203.0.113.7').status_code
+            for i in range(4)
+        ]
+        self.assertEqual(statuses, [200, 200, 200, 429])
+
+        factory = RequestFactory()
+        request = factory.get('/', HTTP_X_FORWARDED_FOR='1.2.3.4, 203.0.113.7', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(client_ip(request), '203.0.113.7')
+        with self.settings(RATELIMIT_TRUSTED_PROXIES=2):
+            self.assertEqual(client_ip(request), '1.2.3.4')
+        with self.settings(RATELIMIT_TRUSTED_PROXIES=3):
+            self.assertEqual(client_ip(request), '10.0.0.1')
+
+    def test_book_travel_limits_posts_per_user(self):
+        """Test that booking submissions are throttled but page views are not."""
+        self.client.force_login(self.user)
+        url = reverse('bookings:book_travel', args=[self.travel_option.id])
+        self.assertEqual(self.client.post(url, {'number_of_seats': 1}).status_code, 302)
+        self.assertEqual(self.client.post(url, {'number_of_seats': 1}).status_code, 429)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(Booking.objects.count(), 1)
+
+
+@override_settings(REPLICA_DATABASES=['replica1'])
+class ReplicaRoutingTestCase(TestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+
+    def route(self, request, view_func):
+        seen = {}
+
+        def get_response(request):
+            ReplicaRoutingMiddleware.process_view(middleware, request, view_func, (), {})
+            seen['booking'] = self.router.db_for_read(Booking)
+            seen['user'] = self.router.db_for_read(User)
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        response = middleware(request)
+        return seen, response
+
+    def test_read_only_views_use_replica(self):
+        """Test that marked views read bookings data from a replica."""
+        seen, _ = self.route(self.factory.get('/'), views.travel_list)
+        self.assertEqual(seen['booking'], 'replica1')
+        # Auth and session data always come from the primary
+        self.assertEqual(seen['user'], 'default')
+        self.assertEqual(self.router.db_for_read(Booking), 'default')
+
+    def test_writes_pin_client_to_primary(self):
+        """Test that a successful write pins the client to the primary."""
+        seen, response = self.route(self.factory.post('/book/'), views.book_travel)
+        self.assertEqual(seen['booking'], 'default')
+        self.assertIn('pin_primary', response.cookies)
+
+        request = self.factory.get('/my-bookings/')
+        request.COOKIES['pin_primary'] = '1'
+        seen, _ = self.route(request, views.my_bookings)
+        self.assertEqual(seen['booking'], 'default')
+
+    def test_unmarked_views_use_primary(self):
+        """Test that views without the marker stay on the primary."""
+        seen, _ = self.route(self.factory.get('/book/'), views.book_travel)
+        self.assertEqual(seen['booking'], 'default')
+
+
+class FileDatabaseMixin:
+    """Run a TransactionTestCase against a temporary file copy of the in-memory test database.
+
+    Only tests that need real cross-connection SQLite locking pay for a file;
+    the rest of the suite stays in memory.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.database_file = None
+        if connection.vendor != 'sqlite' or not connection.is_in_memory_db():
+            return
+        connection.ensure_connection()
+        cls.memory_connection, cls.memory_name = connection.connection, connection.settings_dict['NAME']
+        handle, cls.database_file = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        target = sqlite3.connect(cls.database_file)
+        cls.memory_connection.backup(target)
+        target.close()
+        # Threads build their connections from this same settings dict
+        connection.connection = None
+        connection.settings_dict['NAME'] = cls.database_file
+
+    @classmethod
+    def tearDownClass(cls):
+        if cls.database_file:
+            connection.close()
+            connection.settings_dict['NAME'] = cls.memory_name
+            connection.connection = cls.memory_connection
+            for suffix in ['', '-wal', '-shm']:
+                Path(cls.database_file + suffix).unlink(missing_ok=True)
+        super().tearDownClass()
+
+
+class SQLiteConcurrencyTestCase(FileDatabaseMixin, TransactionTestCase):
+    seats = 5
+    attempts = 12
+
+    def setUp(self):
+        if connection.vendor != 'sqlite' or connection.is_in_memory_db():
+            self.skipTest('Needs a file-backed SQLite database')
+        cache.clear()
+
+    def book_concurrently(self, transaction_mode):
+        travel_option = TravelOption.objects.create(
+            type='BUS',
+            source='Phoenix',
+            destination='Las Vegas',
+            date_time=timezone.now() + timezone.timedelta(days=9),
+            price=Decimal('42.99'),
+            available_seats=self.seats,
+            total_seats=self.seats
+        )
+        users = [User(username=f'{transaction_mode}-{i}') for i in range(self.attempts)]
+        User.objects.bulk_create(users)
+        users = list(User.objects.filter(username__startswith=f'{transaction_mode}-'))
+        url = reverse('bookings:book_travel', args=[travel_option.id])
+        barrier = threading.Barrier(len(users))
+        lock_errors = []
+
+        def book(user):
+            client = Client(raise_request_exception=True)
+            client.force_login(user)
+            connection.ensure_connection()
+            connection.transaction_mode = transaction_mode
+            barrier.wait()
+            try:
+                client.post(url, {'number_of_seats': 1})
+            except OperationalError as exc:
+                lock_errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=book, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        travel_option.refresh_from_db()
+        booked = sum(Booking.objects.filter(travel_option=travel_option).values_list('number_of_seats', flat=True))
+        return travel_option, booked, len(lock_errors)
+
+    def test_immediate_transactions_prevent_overselling_and_lock_errors(self):
+        """Test concurrent bookings on SQLite with BEGIN IMMEDIATE vs deferred transactions."""
+        travel_option, booked, immediate_errors = self.book_concurrently('IMMEDIATE')
+        self.assertEqual(immediate_errors, 0)
+        self.assertEqual(booked, self.seats)
+        self.assertEqual(travel_option.available_seats, 0)
+
+        travel_option, booked, deferred_errors = self.book_concurrently(None)
+        # Deferred transactions may fail with "database is locked", but must never oversell
+        self.assertEqual(booked + travel_option.available_seats, self.seats)
+        self.assertGreater(deferred_errors, 0)
+
+
+class BookingInvariantTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='invariant', password='testpass123')
+        self.travel_option = TravelOption.objects.create(
+            type='TRAIN',
+            source='Denver',
+            destination='Salt Lake City',
+            date_time=timezone.now() + timezone.timedelta(days=6),
+            price=Decimal('55.00'),
+            available_seats=10,
+            total_seats=10
+        )
+
+    def book(self, seats=1):
+        booking = Booking.objects.create(user=self.user, travel_option=self.travel_option, number_of_seats=seats)
+        self.travel_option.available_seats -= seats
+        self.travel_option.save()
+        return booking
+
+    def test_generated_ids_skip_numbers_already_taken(self):
+        """Test booking and travel IDs move past a collision instead of failing."""
+        first, second = self.book(), self.book()
+        first.delete()
+        # The count now points at the second booking's number
+        third = self.book()
+        self.assertNotEqual(third.booking_id, second.booking_id)
+        self.assertEqual(int(third.booking_id[-3:]), int(second.booking_id[-3:]) + 1)
+
+        TravelOption.objects.create(type='TRAIN', source='A', destination='B', date_time=timezone.now(),
+                                    price=Decimal('1.00'), available_seats=1)
+        self.travel_option.delete()
+        travel = TravelOption.objects.create(type='TRAIN', source='C', destination='D', date_time=timezone.now(),
+                                             price=Decimal('1.00'), available_seats=1)
+        self.assertEqual(travel.travel_id, 'T0003')
+
+    def test_stale_booking_cannot_be_cancelled_twice(self):
+        """Test a second cancel from an already-loaded copy does not release seats again."""
+        booking = self.book(seats=3)
+        stale = Booking.objects.get(pk=booking.pk)
+        self.assertTrue(booking.cancel())
+        self.assertFalse(stale.cancel())
+        self.travel_option.refresh_from_db()
+        self.assertEqual(self.travel_option.available_seats, 10)
+        self.assertEqual(check_invariants(), [])
+
+    def test_check_invariants_reports_seat_mismatch(self):
+        """Test the invariant checker flags seats that do not add up."""
+        self.book(seats=2)
+        self.assertEqual(check_invariants([self.travel_option.pk]), [])
+        TravelOption.objects.filter(pk=self.travel_option.pk).update(available_seats=9)
+        self.assertEqual(check_invariants(), [
+            f'{self.travel_option.travel_id}: 2 confirmed + 9 available != 10 total seats'
+        ])
+
+
+class StressHarnessTestCase(FileDatabaseMixin, TransactionTestCase):
+    def setUp(self):
+        if connection.vendor != 'sqlite' or connection.is_in_memory_db():
+            self.skipTest('Needs a file-backed SQLite database')
+        cache.clear()
+
+    def test_concurrent_book_and_cancel_keep_invariants(self):
+        """Test a small threaded stress run completes and cleans up after itself."""
+        out = StringIO()
+        call_command('stress_bookings', operations=60, threads=4, users=3, travel_options=2, seats=20,
+                     seed=7, stdout=out, stderr=StringIO())
+        self.assertIn('Invariants hold', out.getvalue())
+        self.assertIn('60 requests', out.getvalue())
+        self.assertFalse(TravelOption.objects.exists())
+        self.assertFalse(User.objects.exists())
+
+
+class StartupProfileTestCase(TestCase):
+    def test_profile_startup_reports_worker_profile(self):
+        """Test profile_startup times each ready() and the worker profile skips the admin."""
+        out = StringIO()
+        call_command('profile_startup', profiles=['travel_booking.settings', 'travel_booking.settings_worker'],
+                     runs=1, top=3, stdout=out)
+        default, worker = out.getvalue().split('travel_booking.settings_worker\n', 1)
+        self.assertIn('ready(): ', default)
+        self.assertIn(' admin ', default)
+        self.assertIn('-X importtime: ', worker)
+        self.assertNotIn(' admin ', worker.split('-X importtime')[0])
+        self.assertIn('Cold start compared with travel_booking.settings', out.getvalue())
+
+
+class OutboxTestCase(TestCase):
+    def setUp(self):
+        caches['ratelimit'].clear()
+        self.user = User.objects.create_user(username='outbox', password='testpass123')
+        self.travel_option = TravelOption.objects.create(
+            type='BUS',
+            source='Austin',
+            destination='Dallas',
+            date_time=timezone.now() + timezone.timedelta(days=4),
+            price=Decimal('25.00'),
+            available_seats=3,
+            total_seats=3
+        )
+        self.client.force_login(self.user)
+        cache.clear()
+
+    def book(self, seats):
+        return self.client.post(reverse('bookings:book_travel', args=[self.travel_option.id]),
+                                {'number_of_seats': seats})
+
+    def relay(self, path):
+        call_command('relay_events', 'analytics', output=path, stderr=StringIO())
+        with open(path) as relayed:
+            return [json.loads(line) for line in relayed]
+
+    def test_booking_and_cancellation_write_events(self):
+        """Test that booking and cancelling each record one event, and failed bookings none."""
+        self.book(2)
+        self.book(2)
+        booking = Booking.objects.get(user=self.user)
+        self.client.post(reverse('bookings:cancel_booking', args=[booking.id]))
+
+        events = list(OutboxEvent.objects.all())
+        self.assertEqual([event.event_type for event in events], ['booking.confirmed', 'booking.cancelled'])
+        self.assertTrue(all(event.booking == booking.id for event in events))
+        self.assertEqual(events[0].payload['status'], 'CONFIRMED')
+        self.assertEqual(events[0].payload['total_price'], '50.00')
+        self.assertEqual(events[1].payload['travel_id'], self.travel_option.travel_id)
+
+    def test_waitlist_promotion_writes_event(self):
+        """Test that a booking made from the waitlist is recorded too."""
+        entry = WaitlistEntry.objects.create(user=self.user, travel_option=self.travel_option, number_of_seats=1)
+        promote_waitlist(self.travel_option.id)
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.event_type, 'booking.confirmed')
+        self.assertEqual(event.payload['waitlist_entry'], entry.pk)
+
+    def test_relay_streams_in_order_and_checkpoints(self):
+        """Test that relay_events appends new events only and advances the checkpoint."""
+        self.book(1)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'events.jsonl')
+            first = self.relay(path)
+            self.assertEqual([event['event_type'] for event in first], ['booking.confirmed'])
+            self.assertEqual(self.relay(path), first)
+
+            booking = Booking.objects.get(user=self.user)
+            self.client.post(reverse('bookings:cancel_booking', args=[booking.id]))
+            events = self.relay(path)
+        self.assertEqual([event['event_type'] for event in events], ['booking.confirmed', 'booking.cancelled'])
+        self.assertEqual(events[1]['payload']['booking_id'], booking.booking_id)
+        self.assertEqual(OutboxCheckpoint.objects.get(consumer='analytics').last_event_id, events[-1]['id'])
+
+    def test_recent_gap_holds_back_later_events(self):
+        """Test that events after a missing id wait until the gap is old enough to skip."""
+        self.book(1)
+        first = OutboxEvent.objects.get()
+        later = OutboxEvent.objects.create(id=first.id + 2, event_type='booking.cancelled',
+                                           booking=first.booking, payload={})
+        self.assertEqual(pending_events(first.id - 1, 10, gap_seconds=60), [first])
+        self.assertEqual(pending_events(first.id, 10, gap_seconds=60), [])
+        later.created_at = timezone.now() - timezone.timedelta(seconds=61)
+        later.save()
+        self.assertEqual(pending_events(first.id, 10, gap_seconds=60), [later])
+
+    def test_new_consumer_waits_for_a_gap_at_the_start(self):
+        """Test that a consumer with no checkpoint does not skip a still-committing first event."""
+        self.book(1)
+        first = OutboxEvent.objects.get()
+        OutboxEvent.objects.filter(pk=first.pk).update(id=first.id + 1)
+        self.assertEqual(pending_events(0, 10, gap_seconds=60), [])
+        self.assertEqual(relay_batch('analytics', self.send_nothing, gap_seconds=60), 0)
+        self.assertEqual(OutboxCheckpoint.objects.get(consumer='analytics').last_event_id, 0)
+
+    def test_relay_sends_outside_transactions_and_never_rewinds(self):
+        """Test that a batch is sent with no transaction open and a raced checkpoint is kept."""
+        self.book(1)
+        event = OutboxEvent.objects.get()
+        depth = len(connection.atomic_blocks)
+
+        def send(events):
+            self.assertEqual(len(connection.atomic_blocks), depth)
+            # Another relay for this consumer gets further while this batch is being written
+            OutboxCheckpoint.objects.filter(consumer='analytics').update(last_event_id=event.id + 5)
+
+        self.assertEqual(relay_batch('analytics', send), 1)
+        self.assertEqual(OutboxCheckpoint.objects.get(consumer='analytics').last_event_id, event.id + 5)
+
+    def send_nothing(self, events):
+        self.fail(f'Unexpected events {events}')
+
+    def test_purge_keeps_unread_events(self):
+        """Test that only old events every consumer has read are purged."""
+        self.book(1)
+        self.book(1)
+        OutboxEvent.objects.update(created_at=timezone.now() - timezone.timedelta(days=30))
+        first, second = OutboxEvent.objects.all()
+        self.assertEqual(purge_events(7), 0)
+        OutboxCheckpoint.objects.create(consumer='analytics', last_event_id=first.id)
+        OutboxCheckpoint.objects.create(consumer='partner-feed', last_event_id=second.id)
+        self.assertEqual(purge_events(7), 1)
+        self.assertEqual(list(OutboxEvent.objects.all()), [second])
+
+
+class SearchMemoTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.travel_option = TravelOption.objects.create(
+            type='FLIGHT',
+            source='New York',
+            destination='San Francisco',
+            date_time=timezone.now() + timezone.timedelta(days=3),
+            price=Decimal('199.00'),
+            available_seats=12,
+            total_seats=12
+        )
+        search_memo.clear()
+
+    def test_filter_form_normalizes_places(self):
+        """Test that spacing, case and aliases all clean to the same search."""
+        for raw in [' NYC ', 'new   york', 'New York City', 'NEW YORK']:
+            form = FilterForm({'source': raw, 'destination': ' San  Francisco'})
+            self.assertTrue(form.is_valid())
+            self.assertEqual(form.cleaned_data['source'], 'new york')
+            self.assertEqual(form.cleaned_data['destination'], 'san francisco')
+
+    def test_short_tokens_keep_substring_matches(self):
+        """Test that short inputs like "LA" still match every place containing them."""
+        dallas = TravelOption.objects.create(
+            type='BUS', source='Dallas', destination='Austin',
+            date_time=timezone.now() + timezone.timedelta(days=2), price=Decimal('20.00'),
+            available_seats=10, total_seats=10
+        )
+        form = FilterForm({'source': 'LA'})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['source'], 'la')
+        self.assertIn(dallas.pk, search_ids(source='la'))
+
+    def test_equivalent_searches_share_one_memo_entry(self):
+        """Test that a repeated search reads only the shown page, and aliases hit the same entry."""
+        url = reverse('bookings:travel_list')
+        with CaptureQueriesContext(connection) as first:
+            response = self.client.get(url, {'source': 'nyc'})
+        self.assertContains(response, 'San Francisco')
+        with CaptureQueriesContext(connection) as repeat:
+            response = self.client.get(url, {'source': ' New York '})
+        self.assertContains(response, 'San Francisco')
+        self.assertEqual(len(repeat), len(first) - 1)
+
+    def test_page_stays_current_while_memoized(self):
+        """Test that seat changes show up and new departures clear the memo."""
+        url = reverse('bookings:travel_list')
+        etag = self.client.get(url)['ETag']
+        self.travel_option.available_seats = 11
+        self.travel_option.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '11')
+
+        TravelOption.objects.create(type='BUS', source='Boston', destination='Chicago',
+                                    date_time=timezone.now() + timezone.timedelta(days=2),
+                                    price=Decimal('30.00'), available_seats=5)
+        self.assertContains(self.client.get(url), 'Boston')
+
+    @override_settings(SEARCH_MEMO_SIZE=2)
+    def test_memo_is_bounded(self):
+        """Test that the least recently used search is evicted first."""
+        search_ids(source='new york')
+        search_ids(source='boston')
+        search_ids(source='new york')
+        search_ids(source='chicago')
+        self.assertIsNotNone(search_memo.get(('', 'new york', '', '')))
+        self.assertIsNone(search_memo.get(('', 'boston', '', '')))
+
+    @override_settings(SEARCH_MEMO_TTL=0)
+    def test_expired_entries_are_recomputed(self):
+        """Test that entries older than SEARCH_MEMO_TTL are not served."""
+        search_ids(source='new york')
+        self.assertIsNone(search_memo.get(('', 'new york', '', '')))
+
+
+@override_settings(MY_BOOKINGS_PAGE_SIZE=2)
+class BookingHistoryTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='frequent', password='testpass123')
+        other = User.objects.create_user(username='other', password='testpass123')
+        now = timezone.now()
+        options = {}
+        for name, days in [('old', -60), ('recent', -2), ('upcoming', 5)]:
+            options[name] = TravelOption.objects.create(
+                type='TRAIN', source=f'{name.title()} Town', destination='Harbor',
+                date_time=now + timezone.timedelta(days=days), price=Decimal('10.00'),
+                available_seats=50, total_seats=60
+            )
+        plan = ['old', 'recent', 'old', 'recent', 'old', 'upcoming', 'upcoming', 'upcoming']
+        bookings = [Booking.objects.create(user=self.user, travel_option=options[name], number_of_seats=1)
+                    for name in plan]
+        Booking.objects.create(user=other, travel_option=options['recent'], number_of_seats=1)
+        for i, booking in enumerate(bookings):
+            # Pairs share a timestamp so the id tie-break is exercised
+            Booking.objects.filter(pk=booking.pk).update(booking_date=now - timezone.timedelta(days=90 - i // 2))
+        archive_chunk(now - timezone.timedelta(days=30), chunk_size=10)
+        self.client.force_login(self.user)
+
+    def expected(self, *models):
+        rows = [row for model in models for row in model.objects.filter(user=self.user).select_related('travel_option')]
+        return sorted(rows, key=lambda row: (row.booking_date, row.pk), reverse=True)
+
+    def load_all(self, section, first_page, cursor):
+        seen = list(first_page)
+        while cursor:
+            response = self.client.get(reverse('bookings:booking_history'), {'section': section, 'after': cursor})
+            self.assertEqual(response.status_code, 200)
+            page = response.json()
+            seen += re.findall(r'Booking ID: (\S+)', page['html'])
+            cursor = page['next']
+        return seen
+
+    def test_history_pages_cover_live_and_archived_in_order(self):
+        """Test that keyset pages over past bookings return every booking once, newest first."""
+        response = self.client.get(reverse('bookings:my_bookings'))
+        self.assertEqual(len(response.context['past_bookings']), 2)
+        self.assertContains(response, 'Show older bookings')
+        first_page = [booking.booking_id for booking in response.context['past_bookings']]
+
+        seen = self.load_all('past', first_page, response.context['past_next'])
+        past = [row for row in self.expected(Booking, ArchivedBooking) if row.travel_option.date_time <= timezone.now()]
+        self.assertEqual(seen, [row.booking_id for row in past])
+        self.assertEqual(len(seen), 5)
+
+    def test_upcoming_pages_keep_cancel_forms(self):
+        """Test that later pages of upcoming bookings are rendered with working cancel forms."""
+        response = self.client.get(reverse('bookings:my_bookings'))
+        self.assertEqual(len(response.context['current_bookings']), 2)
+        page = self.client.get(reverse('bookings:booking_history'), {
+            'section': 'upcoming', 'after': response.context['current_next']
+        }).json()
+        self.assertIsNone(page['next'])
+        self.assertEqual(page['html'].count('csrfmiddlewaretoken'), 1)
+        upcoming = [row.booking_id for row in self.expected(Booking) if row.travel_option.date_time > timezone.now()]
+        self.assertIn(upcoming[-1], page['html'])
+
+    def test_history_rejects_bad_input(self):
+        """Test that malformed cursors and unknown sections are rejected."""
+        url = reverse('bookings:booking_history')
+        self.assertEqual(self.client.get(url, {'after': 'not-a-cursor'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'section': 'everything'}).status_code, 400)
+
+
+class BookingSummaryTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.travel = TravelOption.objects.create(
+            type='BUS', source='Denver', destination='Boulder',
+            date_time=timezone.now() + timezone.timedelta(days=3), price=Decimal('12.00'),
+            available_seats=40, total_seats=40
+        )
+        self.booking = Booking.objects.create(user=self.user, travel_option=self.travel, number_of_seats=2)
+
+    def test_booking_copies_travel_summary(self):
+        """Test that a new booking carries its travel option's departure and route."""
+        booking = Booking.objects.get(pk=self.booking.pk)
+        self.assertEqual(booking.departure_time, self.travel.date_time)
+        self.assertEqual((booking.travel_type, booking.source, booking.destination), ('BUS', 'Denver', 'Boulder'))
+
+    def test_reschedule_updates_bookings(self):
+        """Test that saving a new schedule rewrites the summary of every booking on the option."""
+        travel = TravelOption.objects.get(pk=self.travel.pk)
+        travel.available_seats -= 1
+        with self.assertNumQueries(1):
+            travel.save()
+
+        travel.date_time = timezone.now() - timezone.timedelta(hours=1)
+        travel.destination = 'Fort Collins'
+        travel.save()
+        booking = Booking.objects.get(pk=self.booking.pk)
+        self.assertEqual(booking.departure_time, travel.date_time)
+        self.assertEqual(booking.destination, 'Fort Collins')
+        self.assertEqual(upcoming_bookings(self.user, timezone.now()), ([], None))
+
+    def test_resaving_new_option_leaves_bookings_alone(self):
+        """Test that saving an option created in this process only rewrites bookings on a real change."""
+        self.travel.available_seats -= 2
+        with self.assertNumQueries(1):
+            self.travel.save()
+
+    def test_booking_lists_skip_travel_join(self):
+        """Test that My Bookings pages are read from the booking table alone."""
+        with CaptureQueriesContext(connection) as queries:
+            rows, _ = upcoming_bookings(self.user, timezone.now())
+            self.client.force_login(self.user)
+            self.client.get(reverse('bookings:booking_history'), {'section': 'upcoming'})
+        self.assertEqual(rows, [self.booking])
+        history = [query['sql'] for query in queries if 'bookings_booking' in query['sql']]
+        self.assertTrue(history)
+        self.assertFalse([sql for sql in history if 'bookings_traveloption' in sql])
+
+    def test_sync_command_repairs_drift(self):
+        """Test that sync_booking_summaries fixes rows changed behind save()."""
+        later = self.travel.date_time + timezone.timedelta(days=1)
+        TravelOption.objects.filter(pk=self.travel.pk).update(date_time=later, type='TRAIN')
+        out = StringIO()
+        call_command('sync_booking_summaries', '--dry-run', stdout=out)
+        self.assertIn('1 bookings have stale', out.getvalue())
+
+        call_command('sync_booking_summaries', stdout=StringIO())
+        booking = Booking.objects.get(pk=self.booking.pk)
+        self.assertEqual((booking.departure_time, booking.travel_type), (later, 'TRAIN'))
+        out = StringIO()
+        call_command('sync_booking_summaries', '--dry-run', stdout=out)
+        self.assertIn('0 bookings have stale', out.getvalue())
+
+    def test_archive_keeps_summary(self):
+        """Test that archived bookings keep the summary columns."""
+        TravelOption.objects.filter(pk=self.travel.pk).update(date_time=timezone.now() - timezone.timedelta(days=60))
+        call_command('sync_booking_summaries', stdout=StringIO())
+        archive_chunk(timezone.now() - timezone.timedelta(days=30), chunk_size=10)
+        archived = ArchivedBooking.objects.get(pk=self.booking.pk)
+        self.assertEqual((archived.travel_type, archived.source), ('BUS', 'Denver'))
+        self.assertEqual(archived.departure_time, archived.travel_option.date_time)
+
+
+class ArchiveTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.departed = TravelOption.objects.create(
+            type='FLIGHT',
+            source='Chicago',
+            destination='Miami',
+            date_time=timezone.now() - timezone.timedelta(days=60),
+            price=Decimal('189.99'),
+            available_seats=10,
+            total_seats=12
+        )
+        self.upcoming = TravelOption.objects.create(
+            type='FLIGHT',
+            source='Seattle',
+            destination='Portland',
+            date_time=timezone.now() + timezone.timedelta(days=6),
+            price=Decimal('99.99'),
+            available_seats=10,
+            total_seats=10
+        )
+        self.old_booking = Booking.objects.create(user=self.user, travel_option=self.departed, number_of_seats=2)
+
+    def test_archive_moves_departed_travel_and_bookings(self):
+        """Test that archiving moves departed rows and leaves upcoming ones."""
+        moved = archive_chunk(timezone.now() - timezone.timedelta(days=30), chunk_size=10)
+        self.assertEqual(moved, (1, 1))
+        self.assertEqual(archive_chunk(timezone.now() - timezone.timedelta(days=30), chunk_size=10), (0, 0))
+
+        self.assertFalse(TravelOption.objects.filter(pk=self.departed.pk).exists())
+        self.assertTrue(TravelOption.objects.filter(pk=self.upcoming.pk).exists())
+        archived = ArchivedBooking.objects.get(pk=self.old_booking.pk)
+        self.assertEqual(archived.booking_id, self.old_booking.booking_id)
+        self.assertEqual(archived.travel_option.travel_id, self.departed.travel_id)
+
+    def test_my_bookings_reads_archive(self):
+        """Test that archived bookings still appear in the booking history."""
+        archive_chunk(timezone.now() - timezone.timedelta(days=30), chunk_size=10)
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('bookings:my_bookings'))
+        self.assertContains(response, 'Chicago')
+        self.assertEqual(response.context['past_bookings'][0].pk, self.old_booking.pk)
+
+    def test_new_ids_do_not_reuse_archived_ones(self):
+        """Test that generated IDs keep counting past archived rows."""
+        archive_chunk(timezone.now() - timezone.timedelta(days=30), chunk_size=10)
+        travel = TravelOption.objects.create(
+            type='FLIGHT',
+            source='Boston',
+            destination='Denver',
+            date_time=timezone.now() + timezone.timedelta(days=3),
+            price=Decimal('249.99'),
+            available_seats=5
+        )
+        self.assertNotIn(travel.travel_id, [self.departed.travel_id, self.upcoming.travel_id])
+        booking = Booking.objects.create(user=self.user, travel_option=travel, number_of_seats=1)
+        self.assertNotEqual(booking.booking_id, self.old_booking.booking_id)
+
+
+class TravelCardCacheTestCase(TestCase):
+    def setUp(self):
+        self.travel_option = TravelOption.objects.create(
+            type='TRAIN',
+            source='Portland',
+            destination='Seattle',
+            date_time=timezone.now() + timezone.timedelta(days=6),
+            price=Decimal('45.99'),
+            available_seats=90,
+            total_seats=140
+        )
+
+    def test_card_fragment_tracks_changes_and_auth_state(self):
+        """Test that cached travel cards follow every saved change and the login state."""
+        url = reverse('bookings:travel_list')
+        self.assertContains(self.client.get(url), '90 seats available')
+
+        TravelOption.objects.filter(pk=self.travel_option.pk).update(available_seats=89, updated_at=timezone.now())
+        response = self.client.get(url)
+        self.assertContains(response, '89 seats available')
+        self.assertContains(response, 'Login to Book')
+
+        self.travel_option.refresh_from_db()
+        self.travel_option.destination = 'Tacoma'
+        self.travel_option.save()
+        self.assertContains(self.client.get(url), 'Tacoma')
+
+        self.client.force_login(User.objects.create_user(username='testuser', password='testpass123'))
+        self.assertContains(self.client.get(url), 'Book Now')
+
+
+class ConditionalListingTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.travel_option = TravelOption.objects.create(
+            type='BUS',
+            source='Austin',
+            destination='Dallas',
+            date_time=timezone.now() + timezone.timedelta(days=4),
+            price=Decimal('25.00'),
+            available_seats=30,
+            total_seats=40
+        )
+
+    def test_travel_list_revalidates_until_data_changes(self):
+        """Test that the listing answers 304 until a travel option changes."""
+        url = reverse('bookings:travel_list')
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('Cookie', response['Vary'])
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.travel_option.available_seats = 29
+        self.travel_option.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_travel_list_etag_depends_on_filters_and_user(self):
+        """Test that different searches and users never share an ETag."""
+        url = reverse('bookings:travel_list')
+        anonymous = self.client.get(url)['ETag']
+        self.assertNotEqual(self.client.get(url, {'type': 'BUS'})['ETag'], anonymous)
+
+        self.client.force_login(self.user)
+        response = self.client.get(url)
+        self.assertNotEqual(response['ETag'], anonymous)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_my_bookings_revalidates_until_booking_changes(self):
+        """Test that My Bookings answers 304 until the user's bookings change."""
+        self.client.force_login(self.user)
+        booking = Booking.objects.create(
+            user=self.user,
+            travel_option=self.travel_option,
+            number_of_seats=1,
+            total_price=Decimal('25.00')
+        )
+        url = reverse('bookings:my_bookings')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        booking.status = 'CANCELLED'
+        booking.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_pending_messages_disable_caching(self):
+        """Test that a page carrying a flash message is never cached or answered with 304."""
+        self.client.force_login(self.user)
+        etag = self.client.get(reverse('bookings:my_bookings'))['ETag']
+        booking = Booking.objects.create(
+            user=self.user,
+            travel_option=self.travel_option,
+            number_of_seats=1,
+            total_price=Decimal('25.00')
+        )
+        self.client.get(reverse('bookings:cancel_booking', args=[booking.id]))
+        response = self.client.get(reverse('bookings:my_bookings'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+        self.assertIn('no-store', response['Cache-Control'])
+
+
+class StaticAssetsTestCase(TestCase):
+    MANIFEST_STORAGES = {
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+    }
+
+    def test_vendored_mode_switches_away_from_cdn(self):
+        """Test that VENDORED_ASSETS serves Bootstrap from STATIC_URL."""
+        url = reverse('bookings:travel_list')
+        self.assertContains(self.client.get(url), 'cdn.jsdelivr.net')
+
+        with override_settings(VENDORED_ASSETS=True):
+            response = self.client.get(url)
+        self.assertNotContains(response, 'cdn.jsdelivr.net')
+        self.assertContains(response, '/static/vendor/bootstrap/css/bootstrap.min.css')
+        self.assertContains(response, '/static/css/style.css')
+
+    def test_collectstatic_writes_hashed_and_compressed_files(self):
+        """Test that the manifest storage emits content-hashed, precompressed copies."""
+        with tempfile.TemporaryDirectory() as static_root, \
+                override_settings(STATIC_ROOT=static_root, STORAGES=self.MANIFEST_STORAGES):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            hashed = staticfiles_storage.stored_name('css/style.css')
+            self.assertRegex(hashed, r'^css/style\.[0-9a-f]{12}\.css$')
+            self.assertTrue(os.path.exists(os.path.join(static_root, hashed + '.gz')))
+
+    def test_vendor_assets_downloads_from_mirror(self):
+        """Test that vendor_assets copies files from a mirror and drops source map references."""
+        with tempfile.TemporaryDirectory() as mirror, tempfile.TemporaryDirectory() as base_dir:
+            for remote, _ in VENDOR_ASSETS:
+                path = Path(mirror) / remote
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_text('body{}\n/*# sourceMappingURL=bootstrap.min.css.map */')
+
+            with override_settings(BASE_DIR=Path(base_dir)):
+                call_command('vendor_assets', source=Path(mirror).as_uri(), stdout=StringIO())
+
+            css = Path(base_dir) / 'static' / 'vendor' / 'bootstrap' / 'css' / 'bootstrap.min.css'
+            self.assertEqual(css.read_text(), 'body{}\n')
+
+
+class BookingExportTestCase(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username='finance', password='testpass123', is_staff=True)
+        self.user = User.objects.create_user(username='testuser', email='test@example.com', password='testpass123')
+        departed = TravelOption.objects.create(
+            type='FLIGHT',
+            source='Chicago',
+            destination='Miami',
+            date_time=timezone.now() - timezone.timedelta(days=60),
+            price=Decimal('189.99'),
+            available_seats=10,
+            total_seats=12
+        )
+        upcoming = TravelOption.objects.create(
+            type='TRAIN',
+            source='Boston',
+            destination='New York',
+            date_time=timezone.now() + timezone.timedelta(days=6),
+            price=Decimal('49.99'),
+            available_seats=10,
+            total_seats=10
+        )
+        Booking.objects.create(user=self.user, travel_option=departed, number_of_seats=1)
+        archive_chunk(timezone.now() - timezone.timedelta(days=30), chunk_size=10)
+        self.live = Booking.objects.create(user=self.user, travel_option=upcoming, number_of_seats=2)
+        self.cancelled = Booking.objects.create(user=self.user, travel_option=upcoming, number_of_seats=1,
+                                                status='CANCELLED')
+
+    def export(self, **params):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('bookings:export_bookings'), params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def test_csv_export_joins_user_and_travel(self):
+        """Test that the CSV export covers live and archived bookings with joined fields."""
+        rows = list(csv.DictReader(StringIO(self.export().decode())))
+        self.assertEqual(len(rows), 3)
+        live = next(row for row in rows if row['booking_id'] == self.live.booking_id)
+        self.assertEqual(live['email'], 'test@example.com')
+        self.assertEqual(live['destination'], 'New York')
+        self.assertEqual(live['total_price'], '99.98')
+        self.assertEqual(sum(row['archived'] == 'True' for row in rows), 1)
+
+    def test_jsonl_gzip_export_with_status_filter(self):
+        """Test that filters apply and gzip output decompresses to JSON Lines."""
+        body = gzip.decompress(self.export(format='jsonl', gzip='1', status='CANCELLED'))
+        rows = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual([row['booking_id'] for row in rows], [self.cancelled.booking_id])
+
+    def test_export_requires_staff(self):
+        """Test that regular users cannot download the export."""
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('bookings:export_bookings'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_export_command_writes_file(self):
+        """Test that export_bookings writes the same rows to a file."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bookings.csv')
+            call_command('export_bookings', output=path, status='CONFIRMED', stderr=StringIO())
+            with open(path, newline='') as export:
+                rows = list(csv.DictReader(export))
+        self.assertEqual(len(rows), 2)
+
+
+class SnapshotTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.user.profile.phone = '5550100'
+        self.user.profile.save()
+        self.travel_option = TravelOption.objects.create(
+            type='FLIGHT',
+            source='Denver',
+            destination='Phoenix',
+            date_time=timezone.now() + timezone.timedelta(days=9),
+            price=Decimal('120.50'),
+            available_seats=40,
+            total_seats=50
+        )
+        self.booking = Booking.objects.create(user=self.user, travel_option=self.travel_option, number_of_seats=2)
+
+    def snapshot(self):
+        stream = BytesIO()
+        write_snapshot(stream, chunk_size=1)
+        stream.seek(0)
+        return stream
+
+    def test_restore_round_trips_rows_exactly(self):
+        """Test that a flushed database is rebuilt with identical rows."""
+        stream = self.snapshot()
+        counts = restore_snapshot(stream, flush=True)
+        self.assertEqual(counts['bookings.booking'], 1)
+
+        booking = Booking.objects.select_related('user__profile', 'travel_option').get()
+        self.assertEqual(booking.booking_id, self.booking.booking_id)
+        self.assertEqual(booking.booking_date, self.booking.booking_date)
+        self.assertEqual(booking.total_price, Decimal('241.00'))
+        self.assertEqual(booking.user.profile.phone, '5550100')
+        self.assertTrue(booking.user.check_password('testpass123'))
+        # Auto-increment keys continue after the restored rows
+        self.assertGreater(User.objects.create_user(username='after').pk, self.user.pk)
+
+    def test_restore_refuses_to_merge(self):
+        """Test that restoring over existing data requires --flush."""
+        with self.assertRaises(SnapshotError):
+            restore_snapshot(self.snapshot())
+
+    def test_truncated_snapshot_is_rejected(self):
+        """Test that a cut-off file fails instead of restoring partial data."""
+        data = self.snapshot().getvalue()
+        with self.assertRaises(SnapshotError):
+            restore_snapshot(BytesIO(data[:-5]), flush=True)
+        self.assertTrue(Booking.objects.filter(pk=self.booking.pk).exists())
+
+
+@override_settings(AVAILABILITY_INDEX=True, AVAILABILITY_INDEX_POLL_SECONDS=60)
+class AvailabilityIndexTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        availability_index.clear()
+        self.addCleanup(availability_index.clear)
+        now = timezone.now()
+        self.options = [
+            TravelOption.objects.create(type=kind, source=source, destination=destination,
+                                        date_time=now + timezone.timedelta(days=days, hours=hours),
+                                        price=Decimal(price), available_seats=seats, total_seats=50)
+            for kind, source, destination, days, hours, price, seats in [
+                ('FLIGHT', 'New York', 'Los Angeles', 1, 0, '299.99', 5),
+                ('TRAIN', 'New York', 'Boston', 2, 3, '49.50', 0),
+                ('BUS', 'Newark', 'Boston', 2, 5, '19.00', 30),
+                ('FLIGHT', 'Chicago', 'Los Angeles', 3, 0, '199.00', 12),
+                ('FLIGHT', 'New York', 'Los Angeles', 4, 0, '279.99', 8),
+            ]
+        ]
+        TravelOption.objects.create(type='BUS', source='New York', destination='Boston',
+                                    date_time=now - timezone.timedelta(hours=1),
+                                    price=Decimal('15.00'), available_seats=10, total_seats=10)
+
+    def listing(self, **params):
+        response = self.client.get(reverse('bookings:travel_list'), params)
+        return [travel.id for travel in response.context['page_obj']]
+
+    def test_search_matches_database_filters(self):
+        """Test that index searches return the same departures as the database path."""
+        searches = [
+            {},
+            {'source': 'new'},
+            {'destination': 'BOSTON', 'type': 'BUS'},
+            {'source': 'york', 'destination': 'angeles'},
+            {'date': (timezone.now() + timezone.timedelta(days=3)).date().isoformat()},
+            {'page': '2'},
+        ]
+        for params in searches:
+            with self.subTest(params=params):
+                indexed = self.listing(**params)
+                with override_settings(AVAILABILITY_INDEX=False):
+                    self.assertEqual(indexed, self.listing(**params))
+
+    def test_listing_runs_from_memory(self):
+        """Test that a warm index serves the listing without querying travel options."""
+        self.listing()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('bookings:travel_list'), {'source': 'new york'})
+        self.assertContains(response, '299.99')
+        self.assertFalse([query for query in queries if 'bookings_traveloption' in query['sql']])
+
+    def test_saves_update_index_on_commit(self):
+        """Test that a committed seat change in this process shows up immediately."""
+        self.listing()
+        travel = self.options[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            travel.available_seats = 0
+            travel.save()
+        travels, _ = availability_index.search(source='New York', destination='Los Angeles')
+        self.assertEqual(travels[0].available_seats, 0)
+
+    def test_poll_picks_up_changes_from_other_processes(self):
+        """Test that rows changed behind the index's back are found by updated_at polling."""
+        self.listing()
+        TravelOption.objects.filter(pk=self.options[3].pk).update(
+            price=Decimal('99.00'), updated_at=timezone.now()
+        )
+        with override_settings(AVAILABILITY_INDEX_POLL_SECONDS=0):
+            travels, stats = availability_index.search(source='Chicago')
+        self.assertEqual(travels[0].price, Decimal('99.00'))
+        self.assertEqual(stats['count'], 1)
+
+    def test_booking_page_reconciles_stale_entry(self):
+        """Test that opening the booking page corrects a stale index entry."""
+        self.listing()
+        travel = self.options[4]
+        TravelOption.objects.filter(pk=travel.pk).update(available_seats=0)
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_login(user)
+
+        response = self.client.get(reverse('bookings:book_travel', args=[travel.id]))
+        self.assertRedirects(response, reverse('bookings:join_waitlist', args=[travel.id]))
+        travels, _ = availability_index.search(source='New York', destination='Los Angeles')
+        self.assertEqual(travels[1].available_seats, 0)
@@ -0,0 +1,126 @@
+import hashlib
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from django.conf import settings
+
+TICKET_SIZE = (1200, 520)
+
+
+def ticket_data(booking):
+    """Plain, picklable snapshot of everything printed on a ticket."""
+    travel = booking.travel_option
+    data = {
+        'id': str(booking.id),
+        'booking_id': booking.booking_id,
+        'status': booking.status,
+        'passenger': booking.user.get_full_name() or booking.user.username,
+        'type': travel.get_type_display(),
+        'travel_id': travel.travel_id,
+        'source': travel.source,
+        'destination': travel.destination,
+        'date_time': travel.date_time.strftime('%b %d, %Y %H:%M'),
+        'seats': booking.number_of_seats,
+        'total_price': str(booking.total_price),
+        # Orders renders of different versions; not printed, so not part of the version
+        'data_time': max(booking.updated_at, travel.updated_at).timestamp(),
+    }
+    data['version'] = ticket_version(data)
+    data['path'] = str(ticket_path(data))
+    return data
+
+
+def ticket_version(data):
+    """Changes whenever the printed content or the ticket layout changes."""
+    content = '|'.join(str(data[key]) for key in sorted(data) if key not in ('version', 'path', 'data_time'))
+    digest = hashlib.sha1(f'{settings.TICKET_TEMPLATE_VERSION}|{content}'.encode()).hexdigest()
+    return digest[:16]
+
+
+def ticket_path(data):
+    return Path(settings.MEDIA_ROOT) / 'tickets' / f"{data['id']}-{data['version']}.pdf"
+
+
+def render_ticket_file(data):
+    """Render one ticket PDF. Runs in worker processes, so it must not touch the ORM."""
+    # Imported here so web processes only load Pillow and qrcode when a ticket is drawn
+    import qrcode
+    from PIL import Image, ImageDraw, ImageFont
+
+    path = Path(data['path'])
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    image = Image.new('RGB', TICKET_SIZE, 'white')
+    draw = ImageDraw.Draw(image)
+    title = ImageFont.load_default(size=44)
+    body = ImageFont.load_default(size=28)
+
+    draw.rectangle([0, 0, TICKET_SIZE[0], 90], fill='#0d6efd')
+    draw.text((40, 22), f"{data['type']} Ticket", font=title, fill='white')
+
+    lines = [
+        f"Booking: {data['booking_id']}",
+        f"Passenger: {data['passenger']}",
+        f"Route: {data['source']} -> {data['destination']}",
+        f"Departure: {data['date_time']}  ({data['travel_id']})",
+        f"Seats: {data['seats']}    Total: ${data['total_price']}",
+        f"Status: {data['status']}",
+    ]
+    for index, line in enumerate(lines):
+        draw.text((40, 130 + index * 56), line, font=body, fill='black')
+
+    qr = qrcode.QRCode(border=2, box_size=8)
+    qr.add_data(f"TB|{data['booking_id']}|{data['id']}|{data['status']}")
+    qr_image = qr.make_image(fill_color='black', back_color='white').get_image().convert('RGB')
+    qr_image = qr_image.resize((340, 340))
+    image.paste(qr_image, (TICKET_SIZE[0] - 380, 130))
+
+    # Write-then-rename so concurrent readers never see a half-written file
+    # Unique temp names also keep threads of one process rendering the same ticket apart
+    with tempfile.NamedTemporaryFile(dir=path.parent, prefix=f'{path.stem}.', suffix='.tmp', delete=False) as tmp:
+        try:
+            image.save(tmp, 'PDF', resolution=150)
+        except BaseException:
+            tmp.close()
+            os.unlink(tmp.name)
+            raise
+    # The file's mtime records how fresh its data is, so a render of older data
+    # (a late task) never deletes a newer version someone may be downloading
+    os.utime(tmp.name, (data['data_time'], data['data_time']))
+    os.replace(tmp.name, path)
+
+    for stale in path.parent.glob(f"{data['id']}-*.pdf"):
+        try:
+            if stale != path and stale.stat().st_mtime < data['data_time']:
+                stale.unlink(missing_ok=True)
+        except FileNotFoundError:
+            pass
+    return str(path)
+
+
+def render_tickets(bookings, workers=None, force=False):
+    """Render tickets for many bookings, fanning out to a process pool."""
+    workers = settings.TICKET_RENDER_WORKERS if workers is None else workers
+    pending = [data for data in map(ticket_data, bookings)
+               if force or not os.path.exists(data['path'])]
+    if not pending:
+        return []
+    if workers <= 1 or len(pending) == 1:
+        return [render_ticket_file(data) for data in pending]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(render_ticket_file, pending, chunksize=max(1, len(pending) // (workers * 4))))
+
+
+def get_ticket(booking):
+    """Return (ticket data, open PDF file), rendering it if the worker has not yet.
+
+    The file is opened rather than checked, so it cannot vanish between the
+    check and the read; a missing file is rendered once and opened again.
+    """
+    data = ticket_data(booking)
+    try:
+        return data, open(data['path'], 'rb')
+    except FileNotFoundError:
+        render_ticket_file(data)
+        return data, open(data['path'], 'rb')
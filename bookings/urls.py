@@ -7,5 +7,10 @@ urlpatterns = [
     path('', views.travel_list, name='travel_list'),
     path('book/<uuid:travel_id>/', views.book_travel, name='book_travel'),
     path('my-bookings/', views.my_bookings, name='my_bookings'),
+    path('my-bookings/history/', views.booking_history, name='booking_history'),
     path('cancel/<uuid:booking_id>/', views.cancel_booking, name='cancel_booking'),
+    path('ticket/<uuid:booking_id>/', views.download_ticket, name='download_ticket'),
+    path('waitlist/<uuid:travel_id>/', views.join_waitlist, name='join_waitlist'),
+    path('waitlist/leave/<int:entry_id>/', views.leave_waitlist, name='leave_waitlist'),
+    path('export/bookings/', views.export_bookings, name='export_bookings'),
 ]
\ No newline at end of file
@@ -1,44 +1,142 @@
+import hashlib
+import re
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
-from django.contrib.auth.decorators import login_required
+from django.template.loader import render_to_string
+from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.core.paginator import Paginator
-from django.db import transaction
+from django.db import IntegrityError, router, transaction
+from django.middleware.csrf import get_token
+from django.db.models import Count, Max, Q
 from django.utils import timezone
-from .models import TravelOption, Booking
-from .forms import BookingForm, FilterForm
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.views.decorators.http import require_POST
+from travel_booking.db_routers import replica_reads
+from travel_booking.ratelimit import ratelimit
+from .models import TravelOption, Booking, WaitlistEntry, IdempotencyKey, ArchivedBooking, OutboxEvent
+from .availability import availability_index
+from .exports import FORMATS, export_rows, export_stream
+from .forms import BookingForm, FilterForm, WaitlistForm, ExportForm
+from .history import decode_cursor, past_bookings, upcoming_bookings
+from .search import SearchResults, search_ids, upcoming_travel_options
+from .tasks import enqueue_on_commit
+from .tickets import ticket_data, get_ticket
 
+IDEMPOTENCY_KEY_RE = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
 
-def travel_list(request):
-    travels = TravelOption.objects.filter(
-        date_time__gt=timezone.now(),
-        available_seats__gt=0
+# The admin's decorator without importing django.contrib.admin, which the lean
+# worker settings leave out; STAFF_LOGIN_URL points at whichever login page exists
+staff_member_required = user_passes_test(lambda user: user.is_active and user.is_staff,
+                                         login_url=settings.STAFF_LOGIN_URL)
+
+
+def _page_etag(request, *parts, csrf=False):
+    """Weak ETag over everything a page shows, or None while flash messages are pending."""
+    if len(messages.get_messages(request)):
+        return None
+    user = request.user
+    if csrf:
+        # POST forms embed a token derived from the CSRF secret; make sure one exists
+        # before hashing it so the first response already carries the final ETag
+        get_token(request)
+    parts = (
+        settings.HTTP_CACHE_VERSION,
+        user.pk if user.is_authenticated else 'anonymous',
+        request.META.get('CSRF_COOKIE', '') if csrf else '',
+        *parts
     )
+    return 'W/"%s"' % hashlib.sha1('|'.join(map(str, parts)).encode()).hexdigest()[:24]
+
+
+def _conditional_render(request, etag, render_page, max_age=0):
+    response = get_conditional_response(request, etag=etag) if etag else None
+    if response is None:
+        response = render_page()
     
+    if etag is None:
+        patch_cache_control(response, private=True, no_store=True)
+    elif request.user.is_authenticated:
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, max_age=max_age)
+    patch_vary_headers(response, ['Cookie'])
+    return response
+
+
+@replica_reads
+@ratelimit('travel_list')
+def travel_list(request):
     form = FilterForm(request.GET)
-    if form.is_valid():
-        if form.cleaned_data['type']:
-            travels = travels.filter(type=form.cleaned_data['type'])
-        if form.cleaned_data['source']:
-            travels = travels.filter(source__icontains=form.cleaned_data['source'])
-        if form.cleaned_data['destination']:
-            travels = travels.filter(destination__icontains=form.cleaned_data['destination'])
-        if form.cleaned_data['date']:
-            travels = travels.filter(date_time__date=form.cleaned_data['date'])
-    
-    paginator = Paginator(travels, 6)
-    page = paginator.get_page(request.GET.get('page'))
-    
-    return render(request, 'bookings/travel_list.html', {
-        'page_obj': page,
-        'form': form
-    })
+    filters = form.cleaned_data if form.is_valid() else {}
+    
+    page = None
+    if settings.AVAILABILITY_INDEX:
+        travels, stats = availability_index.search(**filters)
+    elif settings.SEARCH_MEMO_SIZE:
+        # Matching ids come from the memo; only the page shown is read, so it drives the ETag
+        travels = SearchResults(search_ids(**filters))
+        page = Paginator(travels, 6).get_page(request.GET.get('page'))
+        stats = {
+            'latest': max((travel.updated_at for travel in page), default=None),
+            'count': len(travels),
+            'shown': [str(travel.pk) for travel in page],
+        }
+    else:
+        # Sold-out departures stay listed so users can join their waitlist
+        travels = upcoming_travel_options(**filters)
+        # The newest change plus the row count catch edits, new rows and departures dropping out
+        stats = travels.aggregate(latest=Max('updated_at'), count=Count('id'))
+    
+    etag = _page_etag(request, 'travel_list', request.GET.urlencode(), stats['latest'], stats['count'],
+                      stats.get('shown'))
+    
+    def render_page():
+        paginator = Paginator(travels, 6)
+        return render(request, 'bookings/travel_list.html', {
+            'page_obj': page if page is not None else paginator.get_page(request.GET.get('page')),
+            'form': form,
+            'card_cache_timeout': settings.TRAVEL_CARD_CACHE_TIMEOUT
+        })
+    
+    return _conditional_render(request, etag, render_page, max_age=settings.TRAVEL_LIST_MAX_AGE)
+
+
+def _idempotency_key(request):
+    key = request.headers.get('Idempotency-Key') or request.POST.get('idempotency_key')
+    if key and IDEMPOTENCY_KEY_RE.match(key):
+        return key
+    return None
+
+
+def _replay_booking(request, previous):
+    if previous.booking_id:
+        messages.info(request, f'Booking already confirmed. Booking ID: {previous.booking.booking_id}')
+    else:
+        messages.info(request, 'Your booking is already being processed.')
+    return redirect('bookings:my_bookings')
 
 
 @login_required
+@ratelimit('book_travel', methods=['POST'])
 def book_travel(request, travel_id):
+    key = _idempotency_key(request) if request.method == 'POST' else None
+    if key:
+        previous = IdempotencyKey.lookup(request.user, key)
+        if previous is not None:
+            return _replay_booking(request, previous)
+    
     travel = get_object_or_404(TravelOption, id=travel_id)
+    if settings.AVAILABILITY_INDEX:
+        # The listing may have come from a stale index entry; fix it from this row
+        availability_index.reconcile(travel)
     
     if not travel.is_available:
+        if travel.date_time > timezone.now():
+            return redirect('bookings:join_waitlist', travel_id=travel.id)
         messages.error(request, 'This travel option is not available.')
         return redirect('bookings:travel_list')
     
@@ -46,23 +144,39 @@ def book_travel(request, travel_id):
         form = BookingForm(request.POST, travel_option=travel)
         if form.is_valid():
             with transaction.atomic():
-                travel = TravelOption.objects.select_for_update().get(id=travel_id)
-                seats = form.cleaned_data['number_of_seats']
-                
-                if travel.available_seats >= seats:
-                    booking = form.save(commit=False)
-                    booking.user = request.user
-                    booking.travel_option = travel
-                    booking.total_price = travel.price * seats
-                    booking.save()
+                previous = IdempotencyKey.claim(request.user, key) if key else None
+                if previous is None:
+                    travel = TravelOption.objects.select_for_update().get(id=travel_id)
+                    seats = form.cleaned_data['number_of_seats']
                     
-                    travel.available_seats -= seats
-                    travel.save()
-                    
-                    messages.success(request, f'Booking confirmed! Booking ID: {booking.booking_id}')
-                    return redirect('bookings:my_bookings')
-                else:
-                    messages.error(request, 'Not enough seats available.')
+                    if travel.available_seats >= seats:
+                        booking = form.save(commit=False)
+                        booking.user = request.user
+                        booking.travel_option = travel
+                        booking.total_price = travel.price * seats
+                        booking.save()
+                        
+                        travel.available_seats -= seats
+                        travel.save()
+                        OutboxEvent.record('booking.confirmed', booking)
+                        
+                        if key:
+                            IdempotencyKey.objects.filter(user=request.user, key=key).update(booking=booking)
+                        
+                        payload = {'booking_id': str(booking.id)}
+                        enqueue_on_commit('booking.confirmation_email', payload, key=f'confirmation:{booking.id}')
+                        enqueue_on_commit('ticket.render', payload, key=f'ticket:confirmed:{booking.id}')
+                        enqueue_on_commit('analytics.booking_event', {**payload, 'event': 'booked'},
+                                          key=f'analytics:booked:{booking.id}')
+                        
+                        messages.success(request, f'Booking confirmed! Booking ID: {booking.booking_id}')
+                        return redirect('bookings:my_bookings')
+                    else:
+                        # Release the key so a corrected resubmission is not replayed as a failure
+                        transaction.set_rollback(True)
+                        messages.error(request, 'Not enough seats available.')
+            if previous is not None:
+                return _replay_booking(request, previous)
     else:
         form = BookingForm(travel_option=travel)
     
@@ -72,16 +186,62 @@ def book_travel(request, travel_id):
     })
 
 
+@replica_reads
 @login_required
 def my_bookings(request):
+    now = timezone.now()
     bookings = Booking.objects.filter(user=request.user)
-    current = bookings.filter(travel_option__date_time__gt=timezone.now())
-    past = bookings.filter(travel_option__date_time__lte=timezone.now())
+    archived = ArchivedBooking.objects.filter(user=request.user)
+    # Entries for departed journeys are expired by promote_waitlist; never show them meanwhile
+    waitlist = WaitlistEntry.objects.filter(user=request.user, status='WAITING', travel_option__date_time__gt=now)
     
-    return render(request, 'bookings/my_bookings.html', {
-        'current_bookings': current,
-        'past_bookings': past
-    })
+    stats = bookings.aggregate(
+        count=Count('id'),
+        current=Count('id', filter=Q(departure_time__gt=now)),
+        latest=Max('updated_at')
+    )
+    archived_stats = archived.aggregate(count=Count('id'), latest=Max('archived_at'))
+    waitlist_stats = waitlist.aggregate(count=Count('id'), latest=Max('id'))
+    etag = _page_etag(request, 'my_bookings', *stats.values(), *archived_stats.values(), *waitlist_stats.values(),
+                      csrf=True)
+    
+    def render_page():
+        # Only the first page of each list is rendered; booking_history serves the rest
+        size = settings.MY_BOOKINGS_PAGE_SIZE
+        current, current_next = upcoming_bookings(request.user, now, size=size)
+        history, history_next = past_bookings(request.user, now, size=size)
+        return render(request, 'bookings/my_bookings.html', {
+            'current_bookings': current,
+            'current_next': current_next,
+            'past_bookings': history,
+            'past_next': history_next,
+            'waitlist_entries': waitlist.select_related('travel_option')
+        })
+    
+    return _conditional_render(request, etag, render_page)
+
+
+@replica_reads
+@login_required
+def booking_history(request):
+    """Next page of My Bookings as rendered cards plus the cursor for the page after."""
+    section = request.GET.get('section', 'past')
+    if section not in ('upcoming', 'past'):
+        return HttpResponseBadRequest('Unknown section')
+    try:
+        after = decode_cursor(request.GET['after']) if request.GET.get('after') else None
+    except ValueError:
+        return HttpResponseBadRequest('Invalid cursor')
+    
+    page = upcoming_bookings if section == 'upcoming' else past_bookings
+    bookings, next_cursor = page(request.user, timezone.now(), after, size=settings.MY_BOOKINGS_PAGE_SIZE)
+    html = render_to_string('bookings/booking_cards.html', {
+        'bookings': bookings,
+        'past': section == 'past',
+    }, request=request)
+    response = JsonResponse({'html': html, 'next': next_cursor})
+    patch_cache_control(response, private=True, no_store=True)
+    return response
 
 
 @login_required
@@ -89,8 +249,118 @@ def cancel_booking(request, booking_id):
     booking = get_object_or_404(Booking, id=booking_id, user=request.user)
     
     if booking.cancel():
+        payload = {'booking_id': str(booking.id)}
+        enqueue_on_commit('booking.cancellation_email', payload, key=f'cancellation:{booking.id}')
+        enqueue_on_commit('ticket.render', payload, key=f'ticket:cancelled:{booking.id}')
+        enqueue_on_commit('analytics.booking_event', {**payload, 'event': 'cancelled'},
+                          key=f'analytics:cancelled:{booking.id}')
         messages.success(request, 'Booking cancelled successfully.')
     else:
         messages.error(request, 'Cannot cancel this booking.')
     
-    return redirect('bookings:my_bookings')
\ No newline at end of file
+    return redirect('bookings:my_bookings')
+
+
+@login_required
+def join_waitlist(request, travel_id):
+    travel = get_object_or_404(TravelOption, id=travel_id)
+    
+    if travel.date_time <= timezone.now():
+        messages.error(request, 'This travel option has already departed.')
+        return redirect('bookings:travel_list')
+    if travel.available_seats > 0:
+        return redirect('bookings:book_travel', travel_id=travel.id)
+    if WaitlistEntry.objects.filter(user=request.user, travel_option=travel, status='WAITING').exists():
+        messages.info(request, 'You are already on the waitlist for this journey.')
+        return redirect('bookings:my_bookings')
+    
+    if request.method == 'POST':
+        form = WaitlistForm(request.POST)
+        if form.is_valid():
+            entry = form.save(commit=False)
+            entry.user = request.user
+            entry.travel_option = travel
+            try:
+                with transaction.atomic():
+                    entry.save()
+            except IntegrityError:
+                # A concurrent submit of the same form created the entry first
+                messages.info(request, 'You are already on the waitlist for this journey.')
+                return redirect('bookings:my_bookings')
+            messages.success(request, 'You are on the waitlist. Seats freed by cancellations are booked for you automatically.')
+            return redirect('bookings:my_bookings')
+    else:
+        form = WaitlistForm()
+    
+    return render(request, 'bookings/waitlist.html', {
+        'travel': travel,
+        'form': form
+    })
+
+
+@login_required
+@require_POST
+def leave_waitlist(request, entry_id):
+    entry = get_object_or_404(WaitlistEntry, id=entry_id, user=request.user)
+    
+    if entry.cancel():
+        messages.success(request, 'You have left the waitlist.')
+    else:
+        messages.error(request, 'This waitlist entry is no longer active.')
+    
+    return redirect('bookings:my_bookings')
+
+
+@login_required
+def download_ticket(request, booking_id):
+    booking = get_object_or_404(
+        Booking.objects.select_related('user', 'travel_option'),
+        id=booking_id,
+        user=request.user
+    )
+    
+    # The version changes with the printed content, so it doubles as a strong ETag
+    etag = f'"{ticket_data(booking)["version"]}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        data, ticket = get_ticket(booking)
+        filename = f'ticket-{booking.booking_id}.pdf'
+        if settings.TICKET_SENDFILE_HEADER:
+            ticket.close()
+            response = HttpResponse(content_type='application/pdf')
+            response[settings.TICKET_SENDFILE_HEADER] = (
+                f"{settings.TICKET_SENDFILE_PREFIX.rstrip('/')}/tickets/{data['id']}-{data['version']}.pdf"
+            )
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        else:
+            response = FileResponse(ticket, as_attachment=True,
+                                    filename=filename, content_type='application/pdf')
+    
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+@replica_reads
+@staff_member_required
+def export_bookings(request):
+    form = ExportForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text(), content_type='text/plain')
+    filters = form.cleaned_data
+    
+    # Pick the database now: the response body is streamed after the replica
+    # routing middleware has already reset for this request
+    rows = export_rows(filters['date_from'], filters['date_to'], filters['status'],
+                       using=router.db_for_read(Booking))
+    filename = f"bookings-{timezone.now():%Y%m%d-%H%M%S}.{filters['format']}"
+    if filters['gzip']:
+        response = StreamingHttpResponse(export_stream(rows, filters['format'], compress=True),
+                                         content_type='application/gzip')
+        filename += '.gz'
+    else:
+        response = StreamingHttpResponse(export_stream(rows, filters['format']),
+                                         content_type=f"{FORMATS[filters['format']]}; charset=utf-8")
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    patch_cache_control(response, private=True, no_store=True)
+    return response
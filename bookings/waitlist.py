@@ -0,0 +1,94 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import TravelOption, Booking, WaitlistEntry, OutboxEvent
+
+
+def promote_waitlist(travel_option_id, batch_size=None):
+    """Hand freed seats to waiting users in FIFO order.
+
+    Each batch runs under the same row lock ``book_travel`` takes, so a
+    promotion can never oversell. Promotion stops at the first entry that
+    does not fit, so later (smaller) requests never jump the queue.
+    Returns the list of promoted entries.
+    """
+    batch_size = batch_size or settings.WAITLIST_BATCH_SIZE
+    promoted = []
+    while True:
+        batch, exhausted = _promote_batch(travel_option_id, batch_size)
+        promoted.extend(batch)
+        if exhausted:
+            return promoted
+
+
+def _promote_batch(travel_option_id, batch_size):
+    with transaction.atomic():
+        try:
+            travel = TravelOption.objects.select_for_update().get(pk=travel_option_id)
+        except TravelOption.DoesNotExist:
+            return [], True
+
+        promoted, exhausted = promote_into(travel, batch_size)
+        if promoted:
+            travel.save()
+        return promoted, exhausted
+
+
+def promote_into(travel, limit):
+    """Book up to ``limit`` waiting entries into ``travel``'s free seats, oldest first.
+
+    The caller holds ``travel``'s row lock and saves it afterwards.
+    Returns (promoted entries, whether the queue or the seats ran out).
+    """
+    waiting = WaitlistEntry.objects.select_for_update().filter(
+        travel_option=travel,
+        status='WAITING'
+    )
+
+    if travel.date_time <= timezone.now():
+        waiting.update(status='EXPIRED')
+        return [], True
+    if not limit:
+        return [], True
+
+    entries = list(waiting.order_by('created_at', 'id')[:limit])
+    promoted = []
+    for entry in entries:
+        if entry.number_of_seats > travel.available_seats:
+            break
+
+        booking = Booking(
+            user_id=entry.user_id,
+            travel_option=travel,
+            number_of_seats=entry.number_of_seats,
+            total_price=travel.price * entry.number_of_seats
+        )
+        booking.save()
+        travel.available_seats -= entry.number_of_seats
+        OutboxEvent.record('booking.confirmed', booking, waitlist_entry=entry.pk)
+
+        entry.status = 'PROMOTED'
+        entry.booking = booking
+        entry.promoted_at = timezone.now()
+        entry.save(update_fields=['status', 'booking', 'promoted_at'])
+        promoted.append(entry)
+
+    exhausted = len(promoted) < limit or not travel.available_seats
+    return promoted, exhausted
+
+
+def expire_departed():
+    """Expire waiting entries whose departure has left; returns how many."""
+    return WaitlistEntry.objects.filter(
+        status='WAITING',
+        travel_option__date_time__lte=timezone.now()
+    ).update(status='EXPIRED')
+
+
+def pending_travel_options():
+    """IDs of departures that have free seats and a non-empty queue."""
+    return TravelOption.objects.filter(
+        date_time__gt=timezone.now(),
+        available_seats__gt=0,
+        waitlist_entries__status='WAITING'
+    ).values_list('id', flat=True).distinct()
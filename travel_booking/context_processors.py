@@ -0,0 +1,6 @@
+from django.conf import settings
+
+
+def assets(request):
+    """Tell templates whether to load Bootstrap from STATIC_URL instead of the CDN."""
+    return {'vendored_assets': settings.VENDORED_ASSETS}
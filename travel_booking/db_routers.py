@@ -0,0 +1,76 @@
+import random
+from contextvars import ContextVar
+from django.conf import settings
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def replica_reads(view_func):
+    """Mark a read-only view whose queries may be served by a replica."""
+    view_func.replica_reads = True
+    return view_func
+
+
+class PrimaryReplicaRouter:
+    """Send reads of marked views to a replica, everything else to ``default``.
+
+    Only models of ``REPLICA_ROUTED_APPS`` are routed, so sessions and auth
+    lookups always see the primary even while a request reads from a replica.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (_use_replica.get() and settings.REPLICA_DATABASES
+                and model._meta.app_label in settings.REPLICA_ROUTED_APPS):
+            return random.choice(settings.REPLICA_DATABASES)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """Enable replica reads for marked views and admin changelists.
+
+    After a successful write (booking, cancelling, any POST) the client is
+    pinned to the primary for ``REPLICA_PIN_SECONDS`` via a cookie, so the
+    redirect that follows shows the user their own change despite replica lag.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _use_replica.set(False)
+        try:
+            response = self.get_response(request)
+        finally:
+            _use_replica.reset(token)
+
+        if request.method not in SAFE_METHODS and response.status_code < 400 and settings.REPLICA_DATABASES:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax'
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (request.method in SAFE_METHODS
+                and settings.REPLICA_PIN_COOKIE not in request.COOKIES
+                and (getattr(view_func, 'replica_reads', False) or self.is_admin_changelist(request))):
+            _use_replica.set(True)
+
+    @staticmethod
+    def is_admin_changelist(request):
+        match = request.resolver_match
+        return match is not None and match.namespace == 'admin' and (match.url_name or '').endswith('_changelist')
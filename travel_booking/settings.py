@@ -16,6 +16,8 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
+    # Serve static files through WhiteNoise under runserver too
+    'whitenoise.runserver_nostatic',
     'django.contrib.staticfiles',
     'crispy_forms',
     'crispy_bootstrap5',
@@ -29,10 +31,12 @@ CRISPY_TEMPLATE_PACK = 'bootstrap5'
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'travel_booking.db_routers.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -43,12 +47,19 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'travel_booking.context_processors.assets',
+            ],
+            # Compile each template once per process; runserver still reloads on edits
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
             ],
         },
     },
@@ -56,6 +67,73 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'travel_booking.wsgi.application'
 
+# Caches. Set CACHE_URL to a Redis-protocol server (Redis, Valkey, KeyDB, Dragonfly),
+# e.g. redis://cache:6379/0, to share cached data between processes and servers.
+# Without it every process keeps a private in-memory cache, which is fine for
+# development and tests but not for sessions (see SESSION_BACKEND below).
+CACHE_URL = os.getenv('CACHE_URL', '')
+
+
+def cache_config(name, prefix, max_entries=300):
+    if CACHE_URL:
+        return {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+            'KEY_PREFIX': prefix,
+        }
+    return {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': name,
+        'OPTIONS': {'MAX_ENTRIES': max_entries},
+    }
+
+
+# {% cache %} fragments (travel cards) use "template_fragments"; sessions get their
+# own alias so clearing the default cache does not log everyone out. Rate-limit
+# counters are kept apart too, so a flood of other keys cannot evict them.
+CACHES = {
+    'default': cache_config('default', 'travel'),
+    'template_fragments': cache_config('template-fragments', 'fragments', max_entries=5000),
+    'sessions': cache_config('sessions', 'sessions', max_entries=10000),
+    'ratelimit': cache_config('ratelimit', 'ratelimit', max_entries=100000),
+}
+TRAVEL_CARD_CACHE_TIMEOUT = int(os.getenv('TRAVEL_CARD_CACHE_TIMEOUT', '300'))
+
+# HTTP caching. Listing pages carry ETags; change RELEASE_VERSION on deploys that
+# alter page markup so browsers and CDNs stop revalidating old copies.
+HTTP_CACHE_VERSION = os.getenv('RELEASE_VERSION', '1')
+# How long browsers/CDNs may reuse the anonymous search page without revalidating
+TRAVEL_LIST_MAX_AGE = int(os.getenv('TRAVEL_LIST_MAX_AGE', '30'))
+
+# Serve travel_list from an in-process copy of upcoming inventory instead of the
+# database. Each process picks up other processes' changes within POLL seconds
+# (rows whose updated_at moved) and reloads everything every RELOAD seconds.
+AVAILABILITY_INDEX = os.getenv('AVAILABILITY_INDEX', 'False').lower() == 'true'
+AVAILABILITY_INDEX_POLL_SECONDS = float(os.getenv('AVAILABILITY_INDEX_POLL_SECONDS', '2'))
+AVAILABILITY_INDEX_RELOAD_SECONDS = float(os.getenv('AVAILABILITY_INDEX_RELOAD_SECONDS', '300'))
+# Per-process LRU of normalized search -> matching ids used by travel_list when
+# the availability index is off; 0 disables it. Which departures match can lag
+# other processes by up to SEARCH_MEMO_TTL seconds; seats and prices never do
+SEARCH_MEMO_SIZE = int(os.getenv('SEARCH_MEMO_SIZE', '256'))
+SEARCH_MEMO_TTL = float(os.getenv('SEARCH_MEMO_TTL', '5'))
+# Bookings per section rendered on My Bookings and per "load more" request
+MY_BOOKINGS_PAGE_SIZE = int(os.getenv('MY_BOOKINGS_PAGE_SIZE', '20'))
+
+# Sessions. "cached_db" reads sessions from the shared cache and only falls back to
+# the database on a miss; "cache" never touches the database but loses sessions
+# when the cache is flushed; "signed_cookies" stores the session in the client
+# cookie. Process-local caches cannot invalidate each other, so without CACHE_URL
+# the default stays "db".
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_BACKEND = os.getenv('SESSION_BACKEND', 'cached_db' if CACHE_URL else 'db')
+SESSION_ENGINE = SESSION_ENGINES[SESSION_BACKEND]
+SESSION_CACHE_ALIAS = 'sessions'
+
 # Database
 if os.getenv('DB_ENGINE') == 'postgresql':
     DATABASES = {
@@ -68,6 +146,16 @@ if os.getenv('DB_ENGINE') == 'postgresql':
             'PORT': os.getenv('DB_PORT', '5432'),
         }
     }
+    if os.getenv('DB_POOL', 'False').lower() == 'true':
+        # psycopg 3 connection pool (Django 5.1+); replaces persistent connections
+        DATABASES['default']['OPTIONS'] = {
+            'pool': {
+                'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+                'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+                'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+                'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', '300')),
+            },
+        }
 elif os.getenv('DB_ENGINE') == 'mysql':
     DATABASES = {
         'default': {
@@ -90,6 +178,68 @@ else:
             'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
         }
     }
+    if os.getenv('SQLITE_PERFORMANCE_MODE', 'True').lower() == 'true':
+        # WAL lets readers run alongside the single writer; BEGIN IMMEDIATE takes the
+        # write lock up front (select_for_update is a no-op on SQLite), so concurrent
+        # bookings queue on the busy timeout instead of failing with "database is locked".
+        DATABASES['default']['OPTIONS'] = {
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                f"PRAGMA mmap_size={int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))};"
+                f"PRAGMA cache_size=-{int(os.getenv('SQLITE_CACHE_KB', '65536'))};"
+                'PRAGMA temp_store=MEMORY;'
+            ),
+            'transaction_mode': 'IMMEDIATE',
+            # sqlite3's connect timeout is SQLite's busy_timeout
+            'timeout': float(os.getenv('SQLITE_BUSY_TIMEOUT', '20')),
+        }
+
+# Keep connections open between requests instead of reconnecting every time.
+# Health checks re-validate a reused connection once per request so a database
+# restart does not surface as an error. Pooled PostgreSQL needs CONN_MAX_AGE=0.
+DATABASES['default']['CONN_MAX_AGE'] = (
+    0 if 'pool' in DATABASES['default'].get('OPTIONS', {})
+    else int(os.getenv('DB_CONN_MAX_AGE', '60'))
+)
+DATABASES['default']['CONN_HEALTH_CHECKS'] = os.getenv('DB_CONN_HEALTH_CHECKS', 'True').lower() == 'true'
+
+# Read replicas: comma-separated hosts (PostgreSQL/MySQL, "host" or "host:port") or,
+# for local testing, SQLite files holding a copy of the primary database.
+REPLICA_DATABASES = []
+for index, replica in enumerate(filter(None, os.getenv('DB_REPLICAS', '').split(','))):
+    alias = f'replica{index + 1}'
+    DATABASES[alias] = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+    if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+        DATABASES[alias]['NAME'] = os.path.join(BASE_DIR, replica)
+    else:
+        host, _, port = replica.partition(':')
+        DATABASES[alias].update(HOST=host, PORT=port or DATABASES['default']['PORT'])
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ['travel_booking.db_routers.PrimaryReplicaRouter']
+REPLICA_ROUTED_APPS = ['bookings']
+# After a write, the client reads from the primary for this long (replication lag budget)
+REPLICA_PIN_SECONDS = int(os.getenv('DB_REPLICA_PIN_SECONDS', '15'))
+REPLICA_PIN_COOKIE = 'pin_primary'
+
+# Password hashing. New and changed passwords use PASSWORD_HASHER; existing hashes
+# made with any other listed hasher keep working and are upgraded on the next login.
+# Argon2 needs argon2-cffi; scrypt needs OpenSSL 1.1+.
+PASSWORD_HASHER_CHOICES = {
+    'argon2': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'scrypt': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+}
+PASSWORD_HASHER = os.getenv('PASSWORD_HASHER', 'argon2')
+PASSWORD_HASHERS = [PASSWORD_HASHER_CHOICES[PASSWORD_HASHER]] + [
+    hasher for name, hasher in PASSWORD_HASHER_CHOICES.items() if name != PASSWORD_HASHER
+] + ['django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher']
+
+# Logins verify passwords in a shared thread pool of this size per process, so a
+# login storm cannot occupy every core (or block the event loop under ASGI)
+AUTHENTICATION_BACKENDS = ['accounts.backends.PooledHashingBackend']
+LOGIN_HASH_WORKERS = int(os.getenv('LOGIN_HASH_WORKERS', str(max(1, (os.cpu_count() or 2) // 2))))
 
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -108,12 +258,40 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# collectstatic writes content-hashed copies plus .gz/.br variants, which WhiteNoise
+# serves with a one-year immutable Cache-Control. Development serves files as-is.
+STATIC_MANIFEST = os.getenv('STATIC_MANIFEST', str(not DEBUG)).lower() == 'true'
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage' if STATIC_MANIFEST
+        else 'django.contrib.staticfiles.storage.StaticFilesStorage'
+    },
+}
+# Cache lifetime for static files without a hash in their name
+WHITENOISE_MAX_AGE = int(os.getenv('WHITENOISE_MAX_AGE', '3600'))
+
+# Load Bootstrap from static/vendor (see `manage.py vendor_assets`) instead of the
+# CDN, for offline and air-gapped deployments
+VENDORED_ASSETS = os.getenv('VENDORED_ASSETS', 'False').lower() == 'true'
+VENDOR_ASSETS_SOURCE = os.getenv('VENDOR_ASSETS_SOURCE', 'https://cdn.jsdelivr.net/npm/')
+
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# E-tickets are cached under MEDIA_ROOT/tickets. Bump TICKET_TEMPLATE_VERSION after
+# changing the layout, then run `python manage.py render_tickets`.
+TICKET_TEMPLATE_VERSION = os.getenv('TICKET_TEMPLATE_VERSION', '1')
+TICKET_RENDER_WORKERS = int(os.getenv('TICKET_RENDER_WORKERS', '2'))
+# e.g. X-Accel-Redirect (nginx) or X-Sendfile (Apache) to hand the file to the web server
+TICKET_SENDFILE_HEADER = os.getenv('TICKET_SENDFILE_HEADER', '')
+TICKET_SENDFILE_PREFIX = os.getenv('TICKET_SENDFILE_PREFIX', '/protected-media/')
+
 # Login/Logout URLs
 LOGIN_URL = 'login'
+# Where staff-only pages (the booking export) send users who are not staff
+STAFF_LOGIN_URL = 'admin:login'
 LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = 'home'
 
@@ -121,4 +299,41 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Auth settings
 LOGIN_REDIRECT_URL = 'bookings:travel_list'
-LOGOUT_REDIRECT_URL = 'bookings:travel_list'
\ No newline at end of file
+LOGOUT_REDIRECT_URL = 'bookings:travel_list'
+# Rate limiting: per-user (or per-IP when anonymous) budgets as "<count>/<s|m|h|d>"
+RATELIMIT_ENABLED = os.getenv('RATELIMIT_ENABLED', 'True').lower() == 'true'
+RATELIMIT_CACHE = os.getenv('RATELIMIT_CACHE', 'ratelimit')
+# Set to e.g. HTTP_X_FORWARDED_FOR when running behind a trusted reverse proxy, and
+# RATELIMIT_TRUSTED_PROXIES to the number of proxies that append to that header.
+# The client can write anything to the left of what those proxies added.
+RATELIMIT_IP_HEADER = os.getenv('RATELIMIT_IP_HEADER', 'REMOTE_ADDR')
+RATELIMIT_TRUSTED_PROXIES = int(os.getenv('RATELIMIT_TRUSTED_PROXIES', '1'))
+RATELIMITS = {
+    'travel_list': os.getenv('RATELIMIT_TRAVEL_LIST', '120/m'),
+    'book_travel': os.getenv('RATELIMIT_BOOK_TRAVEL', '10/m'),
+    'register': os.getenv('RATELIMIT_REGISTER', '5/h'),
+}
+
+# Repeated booking submissions with the same idempotency key are replayed for this long
+BOOKING_IDEMPOTENCY_TTL = int(os.getenv('BOOKING_IDEMPOTENCY_TTL', '86400'))
+
+# Waitlist
+WAITLIST_BATCH_SIZE = int(os.getenv('WAITLIST_BATCH_SIZE', '50'))
+
+# Background task queue (see `python manage.py run_tasks`)
+TASK_QUEUE_EAGER = os.getenv('TASK_QUEUE_EAGER', 'False').lower() == 'true'
+TASK_BATCH_SIZE = int(os.getenv('TASK_BATCH_SIZE', '50'))
+TASK_MAX_ATTEMPTS = int(os.getenv('TASK_MAX_ATTEMPTS', '5'))
+TASK_RETRY_BACKOFF = int(os.getenv('TASK_RETRY_BACKOFF', '10'))
+TASK_LEASE_SECONDS = int(os.getenv('TASK_LEASE_SECONDS', '300'))
+
+# Booking outbox read by relay_events. Events after a gap in ids wait this long
+# for the missing (still committing) event; keep it above the slowest booking
+# transaction
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', '500'))
+OUTBOX_GAP_SECONDS = float(os.getenv('OUTBOX_GAP_SECONDS', '10'))
+OUTBOX_RETENTION_DAYS = int(os.getenv('OUTBOX_RETENTION_DAYS', '7'))
+
+# Email
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'bookings@travel-booking.local')
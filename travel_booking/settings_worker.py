@@ -0,0 +1,16 @@
+from .settings import *  # noqa: F401,F403
+from .settings import INSTALLED_APPS
+
+# Lean profile for pods that only serve the booking pages or run background
+# commands: no admin site and no crispy forms (no template uses them). Point
+# DJANGO_SETTINGS_MODULE here and keep the admin on the default profile.
+LEAN_EXCLUDED_APPS = {
+    'django.contrib.admin',
+    'crispy_forms',
+    'crispy_bootstrap5',
+    'whitenoise.runserver_nostatic',
+}
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in LEAN_EXCLUDED_APPS]
+
+ROOT_URLCONF = 'travel_booking.urls_worker'
+STAFF_LOGIN_URL = 'accounts:login'
@@ -0,0 +1,7 @@
+from django.urls import path, include
+
+# travel_booking.urls without the admin site, for settings_worker
+urlpatterns = [
+    path('accounts/', include('accounts.urls')),
+    path('', include('bookings.urls')),
+]